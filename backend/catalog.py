@@ -0,0 +1,79 @@
+# backend/catalog.py
+# ------------------------------------------------------------
+# Shared helpers for caching data derived from the course catalog.
+# ------------------------------------------------------------
+
+import os
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from backend.models import University, DegreeProgram, Course, Skill, CourseSkill
+
+# Models whose rows feed the recommenders' caches
+_CATALOG_MODELS = (University, DegreeProgram, Course, Skill, CourseSkill)
+
+# Upper bound (seconds) on how long a cache may serve data written outside this
+# process (another worker, the scrapers, manual SQL)
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "300"))
+
+# Bumped on every in-process write to a catalog table
+_catalog_writes = 0
+
+
+def catalog_version() -> tuple:
+    """
+    Version token of the catalog: (in-process write counter, TTL period).
+
+    Process-wide caches of data built from the catalog (degree profiles, fitted
+    vectorizers, program indexes) are keyed by it. Any ORM insert, update or
+    delete of a catalog row made in this process changes it when its transaction
+    ends (see the session hooks below); changes made elsewhere are picked up when
+    the current TTL period ends. Computing it issues no query.
+    """
+    return _catalog_writes, int(time.monotonic() // CATALOG_CACHE_TTL)
+
+
+def _mark_catalog_write(session: Session) -> None:
+    session.info["catalog_write"] = True
+
+
+def _bump_if_written(session: Session) -> None:
+    """Bump the write counter once the transaction holding a catalog write ends."""
+    global _catalog_writes
+    if session.info.pop("catalog_write", False):
+        _catalog_writes += 1
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session, flush_context):
+    """Remember that the transaction wrote a catalog row."""
+    changed = (
+        list(session.new)
+        + list(session.deleted)
+        + [obj for obj in session.dirty if session.is_modified(obj)]
+    )
+    if any(isinstance(obj, _CATALOG_MODELS) for obj in changed):
+        _mark_catalog_write(session)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _on_bulk_write(orm_execute_state):
+    """Bulk ORM insert / update / delete statements count as catalog writes too."""
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _mark_catalog_write(orm_execute_state.session)
+
+
+# The counter moves when the transaction ends rather than at flush time: a cache
+# rebuilt by another request in between would otherwise read the pre-commit rows
+# under the new version. Rollbacks bump it too, since the writing session may
+# itself have cached its uncommitted rows.
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    _bump_if_written(session)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session):
+    _bump_if_written(session)
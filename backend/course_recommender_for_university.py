@@ -1,17 +1,91 @@
-from collections import defaultdict
-from typing import List, Dict, Any, Optional
+from collections import Counter, OrderedDict, defaultdict
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from sqlalchemy.orm import Session
-from backend.models import University, Course
+from sqlalchemy import select
+from sqlalchemy.orm import Session, joinedload, selectinload
+from backend.models import University, DegreeProgram, Course, CourseSkill, Skill
+from backend.catalog import catalog_version
+from backend.ranking import top_n_indices
 import json
 import re
+import sys
+import threading
 import logging
 
+# Prefer orjson's faster parser for degree titles; fall back to the stdlib
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Characters kept by normalize_name / _parse_titles: Latin, digits and the Greek
+# Unicode blocks (plus whitespace for names; space, dash and ampersand for titles)
+_NAME_CLEAN_RE = re.compile(r'[^a-zA-Z0-9\s\u0370-\u03FF\u1F00-\u1FFF]')
+_TITLE_CLEAN_RE = re.compile(r"[^a-zA-Z0-9 \-&\u0370-\u03FF\u1F00-\u1FFF]")
+
+# (attribute, fallback) pairs used to build the textual details of a course
+_COURSE_DETAIL_DEFAULTS = (
+    ("description", "No description available."),
+    ("objectives", "No objectives available."),
+    ("learning_outcomes", "No learning outcomes available."),
+    ("course_content", "No course content available."),
+)
+
+
+def _new_vectorizer() -> TfidfVectorizer:
+    """
+    TF-IDF vectorizer used for every profile / course similarity.
+
+    float32 halves the memory traffic of the sparse products (rows stay
+    L2-normalized), and sublinear TF damps words repeated across the many
+    skill names of a document. Fitted once per catalog version over all
+    profiles (see _vectorizer_for), so requests only transform.
+    """
+    return TfidfVectorizer(dtype=np.float32, norm="l2", sublinear_tf=True)
+
+
+# Degree profiles of every university, shared by all recommender instances of the
+# process: (catalog version, profiles). Rebuilt when the version changes.
+_profiles_snapshot: Tuple[Optional[tuple], Tuple[Dict[str, Any], ...]] = (None, ())
+
+# fit_profile_vectorizer over those profiles, for the same version:
+# (catalog version, fitted vectorizer or None when the profiles carry no text)
+_vectorizer_snapshot: Tuple[Optional[tuple], Optional[TfidfVectorizer]] = (None, None)
+
+# Fully ranked suggest_courses results for the same version, least recently used
+# first: (catalog version, {(univ_id, top_n_degrees): suggestions}). Requests slice
+# them to their top_n; at most _SUGGESTIONS_CACHE_SIZE entries are kept.
+_suggestions_cache: Tuple[Optional[tuple], "OrderedDict[tuple, List[Dict[str, Any]]]"] = (None, OrderedDict())
+_suggestions_lock = threading.Lock()
+_SUGGESTIONS_CACHE_SIZE = 256
+
+# Weights of the composite course score, in _course_scores' feature order:
+# frequency, compatibility, new skills, novelty (tuned heuristically)
+_SCORE_WEIGHTS = np.array([0.40, 0.35, 0.15, 0.10])
+
+
+def _course_scores(
+    freq_score: np.ndarray,
+    compat_score: np.ndarray,
+    new_skill_score: np.ndarray,
+    novelty_score: np.ndarray,
+) -> np.ndarray:
+    """
+    Composite course score, computed for all candidates at once.
+
+    Weighted combination of signals (one matrix-vector product against
+    _SCORE_WEIGHTS). If compatibility is low, the score is significantly
+    reduced to avoid poor matches.
+    """
+    features = np.column_stack((freq_score, compat_score, new_skill_score, novelty_score))
+    compatibility_factor = np.where(compat_score >= 0.1, 1.0, 0.05)
+    return np.round(compatibility_factor * (features @ _SCORE_WEIGHTS), 3)
+
 
 class CourseRecommender:
     """
@@ -32,21 +106,48 @@ class CourseRecommender:
             SQLAlchemy session used to query models (University, Course, etc.).
         """
         self.db = db
+        # Per-instance lookup caches; the recommender lives for a single request,
+        # so these never outlive the session they were read from.
+        self._university_cache: Dict[int, Optional[University]] = {}
+        self._course_details_cache: Dict[Tuple[str, Optional[int]], Dict[str, str]] = {}
 
     # ==========================================================
     # Helper methods
     # ==========================================================
     def get_university(self, univ_id: int) -> Optional[University]:
         """
-        Return a University object by id or None if not found.
+        Return a University object by id or None if not found (memoized per instance).
         """
-        return self.db.query(University).filter_by(university_id=univ_id).first()
+        if univ_id not in self._university_cache:
+            self._university_cache[univ_id] = (
+                self._university_query().filter_by(university_id=univ_id).first()
+            )
+        return self._university_cache[univ_id]
 
     def get_all_universities(self) -> List[University]:
         """
         Return a list of all University objects.
+
+        The whole University -> programs -> courses -> skills graph is loaded in a
+        fixed number of queries and the objects are kept in the instance cache, so
+        subsequent get_university / build_degree_profiles calls issue no SQL.
         """
-        return self.db.query(University).all()
+        universities = self._university_query().all()
+        for university in universities:
+            self._university_cache[university.university_id] = university
+        return universities
+
+    def _university_query(self):
+        """
+        Query for University rows with the program/course/skill graph eager-loaded
+        (selectin batches per level instead of one lazy load per object).
+        """
+        return self.db.query(University).options(
+            selectinload(University.programs)
+            .selectinload(DegreeProgram.courses)
+            .selectinload(Course.skills)
+            .joinedload(CourseSkill.skill)
+        )
 
     @staticmethod
     def normalize_name(name: str) -> str:
@@ -59,7 +160,7 @@ class CourseRecommender:
         if not name:
             return ""
         # allow Latin, digits, whitespace and Greek Unicode blocks
-        cleaned_name = re.sub(r'[^a-zA-Z0-9\s\u0370-\u03FF\u1F00-\u1FFF]', '', name)
+        cleaned_name = _NAME_CLEAN_RE.sub('', name)
         return cleaned_name.strip().upper()
 
     @staticmethod
@@ -83,7 +184,7 @@ class CourseRecommender:
             if isinstance(raw_titles, str):
                 # Try to parse JSON-encoded string first
                 try:
-                    parsed = json.loads(raw_titles)
+                    parsed = _json_loads(raw_titles)
                     titles = parsed if isinstance(parsed, list) else [parsed]
                 except Exception:
                     # Fallback: treat the string as a single title
@@ -97,7 +198,7 @@ class CourseRecommender:
 
         # Clean titles: keep letters, digits, space, dash, ampersand and Greek characters
         return [
-            re.sub(r"[^a-zA-Z0-9 \-&\u0370-\u03FF\u1F00-\u1FFF]", "", str(t)).strip()
+            _TITLE_CLEAN_RE.sub("", str(t)).strip()
             for t in titles if t
         ]
 
@@ -107,28 +208,263 @@ class CourseRecommender:
 
         If target_univ_id is provided, restrict the lookup to that university.
         Returns a dict of strings; returns English-friendly default messages when not found.
+        Results are memoized per (course_name, target_univ_id) for the lifetime of the instance.
+        """
+        key = (course_name, target_univ_id)
+        if key not in self._course_details_cache:
+            query = self.db.query(Course).filter(Course.lesson_name == course_name)
+            if target_univ_id is not None:
+                query = query.filter(Course.university_id == target_univ_id)
+            self._course_details_cache[key] = self._course_details(query.first())
+        return self._course_details_cache[key]
+
+    def _prefetch_course_details(self, course_names: List[str], target_univ_id: Optional[int] = None) -> None:
+        """
+        Fill the get_course_details_by_name cache for several courses with one IN query.
+
+        Only the detail columns are selected. As with the per-name lookup, the
+        first matching course by id wins and missing courses get the defaults.
         """
-        query = self.db.query(Course).filter(Course.lesson_name == course_name)
+        missing = {name for name in course_names if (name, target_univ_id) not in self._course_details_cache}
+        if not missing:
+            return
+
+        query = self.db.query(
+            Course.lesson_name, *(getattr(Course, attr) for attr, _ in _COURSE_DETAIL_DEFAULTS)
+        ).filter(Course.lesson_name.in_(missing))
         if target_univ_id is not None:
             query = query.filter(Course.university_id == target_univ_id)
-        course = query.first()
-
-        if course:
-            return {
-                "description": (getattr(course, "description", "") or "No description available.").strip(),
-                "objectives": (getattr(course, "objectives", "") or "No objectives available.").strip(),
-                "learning_outcomes": (getattr(course, "learning_outcomes", "") or "No learning outcomes available.").strip(),
-                "course_content": (getattr(course, "course_content", "") or "No course content available.").strip(),
-            }
 
-        # Defaults when course not found
+        for row in query.order_by(Course.course_id):
+            key = (row.lesson_name, target_univ_id)
+            if row.lesson_name in missing and key not in self._course_details_cache:
+                self._course_details_cache[key] = self._course_details(row)
+        for name in missing:
+            self._course_details_cache.setdefault((name, target_univ_id), self._course_details(None))
+
+    def _get_course_skills_by_name(self, course_names) -> Dict[str, set]:
+        """
+        Return the explicit skill names attached to each course, keyed by lesson_name.
+
+        One query returns (course_id, lesson_name, skill_name) rows for every
+        candidate name, so no ORM objects or relationships are loaded. When several
+        courses share a name, the first one by id is used, as the previous per-name
+        `.first()` lookup did.
+        """
+        if not course_names:
+            return {}
+
+        rows = (
+            self.db.query(Course.course_id, Course.lesson_name, Skill.skill_name)
+            .outerjoin(CourseSkill, CourseSkill.course_id == Course.course_id)
+            .outerjoin(Skill, Skill.skill_id == CourseSkill.skill_id)
+            .filter(Course.lesson_name.in_(course_names))
+            .order_by(Course.course_id)
+            .all()
+        )
+
+        skills_by_name: Dict[str, set] = {}
+        course_by_name: Dict[str, int] = {}
+        for course_id, lesson_name, skill_name in rows:
+            # Only the first course (by id) of each name contributes skills
+            if course_by_name.setdefault(lesson_name, course_id) != course_id:
+                continue
+            skills = skills_by_name.setdefault(lesson_name, set())
+            skill_name = (skill_name or "").strip()
+            if skill_name:
+                skills.add(skill_name)
+        return skills_by_name
+
+    def _aggregate_candidate_courses(
+        self,
+        similar_degrees: List[Dict[str, Any]],
+        exclude_courses: frozenset = frozenset(),
+    ) -> Tuple[Dict[str, int], Dict[str, set], Dict[str, set]]:
+        """
+        Collect candidate courses (and their skills) across the similar degrees.
+
+        Returns (course_freq, course_skills, course_specific_skills_map):
+          - course_freq: how many similar degrees include each course
+          - course_skills: degree-level + course-level skills combined per course
+          - course_specific_skills_map: the course's own skills (from DB)
+        Empty names and names in `exclude_courses` are skipped.
+        """
+        course_freq = Counter()
+        course_skills = defaultdict(set)
+        course_specific_skills_map = dict()
+
+        # Fetch the explicit skills of every candidate course in one query
+        skills_by_cname = self._get_course_skills_by_name({
+            cname
+            for deg in similar_degrees
+            for cname in deg.get("courses", [])
+            if cname and cname not in exclude_courses
+        })
+
+        for deg in similar_degrees:
+            deg_skills = deg.get("_skills_set")
+            if deg_skills is None:
+                deg_skills = frozenset(deg.get("skills", []))
+            # A course is registered if it has any skills (from degree-level or course-level)
+            registered = [
+                cname for cname in deg.get("courses", [])
+                if cname and cname not in exclude_courses
+                and (deg_skills or skills_by_cname.get(cname))
+            ]
+            # Counter.update counts the whole batch in C instead of one += per course
+            course_freq.update(registered)
+
+            for cname in registered:
+                course_specific_skills = skills_by_cname.get(cname, set())
+                skills = course_skills[cname]
+                skills |= deg_skills
+                skills |= course_specific_skills
+                course_specific_skills_map[cname] = course_specific_skills
+
+        return course_freq, course_skills, course_specific_skills_map
+
+    @staticmethod
+    def _course_details(course: Optional[Course]) -> Dict[str, str]:
+        """
+        Map a Course row (or None) to its textual details in a single pass,
+        falling back to the default messages for missing/empty fields.
+        """
+        if course is None:
+            return {attr: default for attr, default in _COURSE_DETAIL_DEFAULTS}
         return {
-            "description": "No description available.",
-            "objectives": "No objectives available.",
-            "learning_outcomes": "No learning outcomes available.",
-            "course_content": "No course content available.",
+            attr: (getattr(course, attr, "") or default).strip()
+            for attr, default in _COURSE_DETAIL_DEFAULTS
         }
 
+    @staticmethod
+    def _profile_text(profile: Dict[str, Any]) -> str:
+        """
+        Skills + courses of a profile as one TF-IDF document. Uses the `_text`
+        precomputed by build_degree_profiles; other dicts (e.g. a synthetic
+        target) are joined on the fly.
+        """
+        text = profile.get("_text")
+        if text is None:
+            text = " ".join((profile.get("skills") or []) + (profile.get("courses") or [])).strip()
+        return text
+
+    def fit_profile_vectorizer(self, all_profiles: List[Dict[str, Any]]) -> Optional[TfidfVectorizer]:
+        """
+        Fit one TF-IDF vectorizer on the skills + courses text of every profile.
+
+        Passing the result to find_similar_degrees / suggest_courses_for_* replaces
+        their per-call vocabulary and IDF fit with a plain transform. Returns None
+        when the profiles carry no usable text, in which case callers fit per call.
+        """
+        corpus = [text for text in map(self._profile_text, all_profiles) if text]
+        if not corpus:
+            return None
+        try:
+            return _new_vectorizer().fit(corpus)
+        except ValueError:
+            # e.g. empty vocabulary after tokenization
+            return None
+
+    @staticmethod
+    def _tfidf(docs: List[str], vectorizer: Optional[TfidfVectorizer] = None):
+        """
+        TF-IDF matrix for `docs`: transform with a pre-fitted vectorizer when given,
+        otherwise fit a fresh one on the docs themselves.
+        """
+        if vectorizer is None:
+            return _new_vectorizer().fit_transform(docs)
+        return vectorizer.transform(docs)
+
+    @staticmethod
+    def _target_similarities(vectors) -> np.ndarray:
+        """
+        Cosine similarity of the last row of a TF-IDF matrix (the target doc)
+        against every other row.
+
+        The TF-IDF rows are already L2-normalized (norm='l2', for fit_transform
+        and transform alike), so the cosine is a plain dot
+        product and cosine_similarity's re-normalization pass is redundant.
+        Multiplying the whole CSR matrix by the target row avoids the copies
+        made by slicing `vectors[:-1]`; the target's self-similarity is simply
+        dropped from the result.
+        """
+        target = vectors.getrow(vectors.shape[0] - 1)
+        return vectors.dot(target.T).toarray().ravel()[:-1]
+
+    def _rank_courses(
+        self,
+        courses_list: List[str],
+        course_freq: Dict[str, int],
+        course_skills: Dict[str, set],
+        course_specific_skills_map: Dict[str, set],
+        target_skills: frozenset,
+        sims: np.ndarray,
+        top_n: Optional[int],
+        target_univ_id: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Score candidate courses against the target skills and return the top_n
+        (every candidate when top_n is None) as result dicts, sorted by score
+        (descending).
+
+        Skills are mapped to bit positions so the Jaccard sizes are popcounts of
+        integer masks instead of temporary Python sets. Skill name lists and
+        course details are only materialized for the selected courses.
+        """
+        skill_bits: Dict[str, int] = {}
+
+        def to_mask(skills) -> int:
+            mask = 0
+            for skill in skills:
+                mask |= 1 << skill_bits.setdefault(skill, len(skill_bits))
+            return mask
+
+        target_mask = to_mask(target_skills)
+        skill_masks = [to_mask(course_skills[c]) for c in courses_list]
+        new_skill_masks = [
+            to_mask(course_specific_skills_map.get(c, ())) & ~target_mask for c in courses_list
+        ]
+
+        # Per-course counts as arrays; every score below is a vectorized op over them
+        n = len(courses_list)
+        freq = np.fromiter((course_freq[c] for c in courses_list), dtype=np.float64, count=n)
+        inter_size = np.fromiter(((m & target_mask).bit_count() for m in skill_masks), dtype=np.float64, count=n)
+        union_size = np.fromiter(((m | target_mask).bit_count() for m in skill_masks), dtype=np.float64, count=n)
+        skill_count = np.fromiter((m.bit_count() for m in skill_masks), dtype=np.float64, count=n)
+        new_count = np.fromiter((m.bit_count() for m in new_skill_masks), dtype=np.float64, count=n)
+
+        freq_score = freq / freq.max()                                      # normalized frequency
+        # Compatibility: Jaccard-like measure between course skills and target skills
+        compat_score = np.divide(inter_size, union_size, out=np.zeros(n), where=union_size > 0)
+        new_skill_score = new_count / (skill_count + 1)                     # proportion of new skills in the course
+        novelty_score = 1.0 - np.asarray(sims)                              # TF-IDF based novelty (higher => more novel)
+        scores = _course_scores(freq_score, compat_score, new_skill_score, novelty_score)
+
+        top_idx = top_n_indices(scores, n if top_n is None else top_n)
+        logger.debug("Scored %d candidate courses, returning %d", n, len(top_idx))
+
+        # Details of all selected courses in one query (served from the cache below)
+        self._prefetch_course_details([courses_list[i] for i in top_idx], target_univ_id)
+
+        results = []
+        for i in top_idx:
+            cname = courses_list[i]
+            new_skills = course_specific_skills_map.get(cname, set()) - target_skills
+            compat_skills = course_skills[cname] & target_skills
+            course_details = self.get_course_details_by_name(cname, target_univ_id)
+
+            results.append({
+                "course_name": cname,
+                "score": float(scores[i]),
+                "new_skills": sorted(new_skills),
+                "compatible_skills": sorted(compat_skills),
+                "description": course_details["description"],
+                "objectives": course_details["objectives"],
+                "learning_outcomes": course_details["learning_outcomes"],
+                "course_content": course_details["course_content"],
+            })
+        return results
+
     # ==========================================================
     # 1) Build degree profiles
     # ==========================================================
@@ -140,9 +476,12 @@ class CourseRecommender:
             - university_id
             - program_id
             - degree_title
+            - norm_title (interned normalize_name(degree_title), computed once here)
             - degree_type
             - skills (sorted list of skill names)
             - courses (sorted list of course names)
+            - _text (skills + courses joined into one document, for TF-IDF)
+            - _skills_set (frozenset of the skill names)
 
         This function reads the relationships from the ORM objects.
         """
@@ -173,6 +512,10 @@ class CourseRecommender:
                         if skill_name:
                             skills.add(skill_name)
             skills = sorted(list(skills))
+            # Shared by every title of the program: the TF-IDF text and the skill set
+            # are built once here instead of on every similarity / aggregation pass
+            text = " ".join(skills + courses).strip()
+            skills_set = frozenset(skills)
 
             # Create a profile entry per declared degree title
             for title in titles:
@@ -182,12 +525,60 @@ class CourseRecommender:
                     "university_id": univ_id,
                     "program_id": program_id,
                     "degree_title": title,
+                    # Interned: equal catalog titles share one string object, so the
+                    # title comparisons hit CPython's identity fast path
+                    "norm_title": sys.intern(self.normalize_name(title)),
                     "degree_type": degree_type,
                     "skills": skills,
                     "courses": courses,
+                    "_text": text,
+                    "_skills_set": skills_set,
                 })
         return profiles
 
+    def get_all_profiles(self) -> List[Dict[str, Any]]:
+        """
+        Degree profiles of every university (build_degree_profiles for each).
+
+        The result is kept process-wide and reused while the catalog version
+        is unchanged (see backend.catalog), so repeat requests issue no query
+        instead of re-walking the whole catalog. The profile dicts are shared: treat them
+        as read-only.
+        """
+        return self._profiles_for(catalog_version())
+
+    def get_all_profiles_with_vectorizer(self) -> Tuple[List[Dict[str, Any]], Optional[TfidfVectorizer]]:
+        """
+        get_all_profiles together with fit_profile_vectorizer fitted on them.
+
+        Both are kept process-wide for the same catalog version, so repeat
+        requests neither rebuild the profiles nor refit the TF-IDF pipeline. The vectorizer is shared: only call transform on it.
+        """
+        version = catalog_version()
+        return self._profiles_for(version), self._vectorizer_for(version)
+
+    def _profiles_for(self, version: tuple) -> List[Dict[str, Any]]:
+        """get_all_profiles for an already computed catalog version."""
+        global _profiles_snapshot
+        cached_version, profiles = _profiles_snapshot
+        if cached_version != version:
+            profiles = tuple(
+                profile
+                for university in self.get_all_universities()
+                for profile in self.build_degree_profiles(university.university_id)
+            )
+            _profiles_snapshot = (version, profiles)
+        return list(profiles)
+
+    def _vectorizer_for(self, version: tuple) -> Optional[TfidfVectorizer]:
+        """fit_profile_vectorizer over _profiles_for(version), fitted once per version."""
+        global _vectorizer_snapshot
+        cached_version, vectorizer = _vectorizer_snapshot
+        if cached_version != version:
+            vectorizer = self.fit_profile_vectorizer(self._profiles_for(version))
+            _vectorizer_snapshot = (version, vectorizer)
+        return vectorizer
+
     # ==========================================================
     # 2) Find similar degrees
     # ==========================================================
@@ -196,6 +587,7 @@ class CourseRecommender:
         target_profile: Dict[str, Any],
         all_profiles: List[Dict[str, Any]],
         top_n: int = 5,
+        vectorizer: Optional[TfidfVectorizer] = None,
     ) -> List[Dict[str, Any]]:
         """
         Find the top-N most similar degrees to `target_profile` among `all_profiles`.
@@ -213,10 +605,10 @@ class CourseRecommender:
         degree_type = (target_profile.get("degree_type") or "").strip()
 
         # Build a single text for target: skills + courses
-        target_text = " ".join(
-            (target_profile.get("skills") or []) +
-            (target_profile.get("courses") or [])
-        ).strip()
+        target_text = self._profile_text(target_profile)
+        # An empty target is dissimilar to everything: skip candidate filtering and TF-IDF
+        if not target_text:
+            return []
 
         # Filter raw candidates by degree_type and not from the same university
         raw_candidates = [
@@ -227,23 +619,76 @@ class CourseRecommender:
 
         cand_objs, cand_texts = [], []
         for p in raw_candidates:
-            text = " ".join((p.get("skills") or []) + (p.get("courses") or [])).strip()
+            text = self._profile_text(p)
             if text:
                 cand_objs.append(p)
                 cand_texts.append(text)
 
         # If there is no textual information, we cannot compute TF-IDF similarities
-        if not target_text or not cand_texts:
+        if not cand_texts:
             return []
 
-        # TF-IDF + cosine similarity: compute similarity of target vs each candidate
-        vectorizer = TfidfVectorizer()
-        vectors = vectorizer.fit_transform([target_text] + cand_texts)
-        sims = cosine_similarity(vectors[0:1], vectors[1:]).flatten()
+        # Identical candidate texts all get the same similarity, so the ranking is
+        # just their original order and TF-IDF can be skipped entirely
+        if len(set(cand_texts)) == 1:
+            return cand_objs[:top_n]
+
+        # TF-IDF + cosine similarity: compute similarity of target (last row) vs each candidate
+        vectors = self._tfidf(cand_texts + [target_text], vectorizer)
+        sims = self._target_similarities(vectors)
 
-        # Rank candidates by similarity score (descending) and return top_n objects
-        ranked = sorted(zip(cand_objs, sims), key=lambda x: x[1], reverse=True)
-        return [p for p, _ in ranked[:top_n]]
+        # Select the top_n candidates by similarity (descending) without sorting them all
+        return [cand_objs[i] for i in top_n_indices(sims, top_n)]
+
+    def find_similar_degrees_batch(
+        self,
+        target_profiles: List[Dict[str, Any]],
+        all_profiles: List[Dict[str, Any]],
+        top_n: int = 5,
+        vectorizer: Optional[TfidfVectorizer] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        find_similar_degrees for several targets at once, sharing one fitted vectorizer.
+
+        The candidate matrix is transformed once and the similarities of every
+        target come from a single sparse product (targets x candidates). Per-target
+        eligibility (same degree_type, other university, non-empty text) is applied
+        as a boolean mask before the top-N selection, so each row gives the same
+        ranking find_similar_degrees gives with the same vectorizer.
+        Returns one list of similar profiles per target, in target order.
+        """
+        if not target_profiles:
+            return []
+        if vectorizer is None:
+            vectorizer = self.fit_profile_vectorizer(all_profiles)
+        if vectorizer is None or not all_profiles:
+            return [[] for _ in target_profiles]
+
+        cand_texts = [self._profile_text(p) for p in all_profiles]
+        cand_types = np.array([(p.get("degree_type") or "").strip() for p in all_profiles])
+        cand_univs = np.array([p.get("university_id") for p in all_profiles], dtype=object)
+        has_text = np.fromiter((bool(t) for t in cand_texts), dtype=bool, count=len(cand_texts))
+
+        target_texts = [self._profile_text(t) for t in target_profiles]
+        sims = (
+            vectorizer.transform(target_texts)
+            .dot(vectorizer.transform(cand_texts).T)
+            .toarray()
+        )
+
+        results: List[List[Dict[str, Any]]] = []
+        for row, target, target_text in zip(sims, target_profiles, target_texts):
+            eligible = (
+                has_text
+                & (cand_types == (target.get("degree_type") or "").strip())
+                & (cand_univs != target.get("university_id"))
+            )
+            if not target_text or not eligible.any():
+                results.append([])
+                continue
+            idx = np.flatnonzero(eligible)
+            results.append([all_profiles[idx[i]] for i in top_n_indices(row[idx], top_n)])
+        return results
 
     # ==========================================================
     # 3) Suggest courses for an existing degree
@@ -252,7 +697,8 @@ class CourseRecommender:
         self,
         target_degree: Dict[str, Any],
         similar_degrees: List[Dict[str, Any]],
-        top_n: int = 10,
+        top_n: Optional[int] = 10,
+        vectorizer: Optional[TfidfVectorizer] = None,
     ) -> List[Dict[str, Any]]:
         """
         Suggest courses for an existing target degree using similar degrees.
@@ -268,43 +714,21 @@ class CourseRecommender:
               * novelty (new_skill_score)
               * TF-IDF novelty (novelty_score)
             A small compatibility factor is applied when compatibility is low to demote unsuitable matches.
-          - Return top_n course dicts with details and computed scores.
+          - Return top_n course dicts (all of them when top_n is None) with details
+            and computed scores.
         """
         if not target_degree or not similar_degrees:
             return [{"info": "No similar degrees available for recommendation."}]
 
-        target_skills = set(target_degree.get("skills", []))
-        target_courses = set(target_degree.get("courses", []))
-
-        # Aggregation structures
-        course_freq = defaultdict(int)              # how many similar degrees include this course
-        course_skills = defaultdict(set)            # combined skills associated with the course
-        course_specific_skills_map = dict()         # skills that are specific to the course (from DB)
+        # Built once and only read afterwards (membership tests and set algebra)
+        target_skills = frozenset(target_degree.get("skills", []))
+        target_courses = frozenset(target_degree.get("courses", []))
 
-        # Collect candidate courses and skills from similar degrees
-        for deg in similar_degrees:
-            deg_skills = set(deg.get("skills", []))
-            for cname in deg.get("courses", []):
-                # skip empty names and courses that already exist in target
-                if not cname or cname in target_courses:
-                    continue
-
-                db_course = self.db.query(Course).filter(Course.lesson_name == cname).first()
-                course_specific_skills = set()
-                if db_course:
-                    # Extract explicit skills attached to this course (ORM relation)
-                    for cs in getattr(db_course, "skills", []):
-                        if getattr(cs, "skill", None):
-                            skill_name = (cs.skill.skill_name or "").strip()
-                            if skill_name:
-                                course_specific_skills.add(skill_name)
-
-                # If we found any skills (from degree-level or course-level), register the course
-                if course_specific_skills or deg_skills:
-                    total_skills = deg_skills.union(course_specific_skills)
-                    course_freq[cname] += 1
-                    course_skills[cname].update(total_skills)
-                    course_specific_skills_map[cname] = course_specific_skills
+        # Collect candidate courses and skills from similar degrees,
+        # skipping courses that already exist in the target
+        course_freq, course_skills, course_specific_skills_map = self._aggregate_candidate_courses(
+            similar_degrees, target_courses
+        )
 
         # No candidate courses found
         if not course_freq:
@@ -315,66 +739,131 @@ class CourseRecommender:
         courses_list = list(course_freq.keys())
         course_docs = [" ".join(course_skills[c]) for c in courses_list]
         target_doc = " ".join(target_skills)
-        docs = course_docs + [target_doc]
 
-        # If there is no textual skill information, bail out
-        if all(not doc.strip() for doc in docs):
-            logger.info("Recommendation failed due to lack of skill text for comparison.")
-            return [{"info": "Recommendation failed due to lack of skill text for comparison."}]
+        if not target_doc.strip():
+            # If there is no textual skill information at all, bail out
+            if all(not doc.strip() for doc in course_docs):
+                logger.info("Recommendation failed due to lack of skill text for comparison.")
+                return [{"info": "Recommendation failed due to lack of skill text for comparison."}]
+            # An empty target has zero similarity to every course; skip TF-IDF
+            sims = np.zeros(len(courses_list))
+        else:
+            # Compute TF-IDF vectors and similarities between target and each candidate
+            vectors = self._tfidf(course_docs + [target_doc], vectorizer)
+            # similarity of last doc (target) to each course doc
+            sims = self._target_similarities(vectors)
+
+        # Score every candidate and keep the top-N (descending), restricting course details
+        # to the target university so the description is relevant
+        return self._rank_courses(
+            courses_list, course_freq, course_skills, course_specific_skills_map,
+            target_skills, sims, top_n, target_univ_id=target_degree["university_id"],
+        )
 
-        # Compute TF-IDF vectors and similarities between target and each candidate
-        vectorizer = TfidfVectorizer()
-        vectors = vectorizer.fit_transform(docs)
-        # similarity of last doc (target) to each course doc
-        sims = cosine_similarity(vectors[-1], vectors[:-1]).flatten()
+    # ==========================================================
+    # 3b) Suggest courses for every degree of a university
+    # ==========================================================
+    def suggest_courses(self, univ_id: int, top_n: int = 10, top_n_degrees: int = 5) -> List[Dict[str, Any]]:
+        """
+        Suggest courses for each degree profile of a university.
+
+        Profiles of all universities come from get_all_profiles, one vectorizer
+        is fitted on them, and the similar degrees of every target profile are
+        found with a single batched TF-IDF product (find_similar_degrees_batch).
+        Each target is then passed to suggest_courses_for_degree with the same
+        vectorizer.
+
+        The full ranking of every target is cached process-wide per
+        (univ_id, top_n_degrees) until the catalog version changes, and sliced
+        to top_n, so a repeat request issues no query whatever its top_n.
+        Universities without degree profiles are not cached; the cache keeps
+        the _SUGGESTIONS_CACHE_SIZE most recently used entries.
+        warm_suggestions precomputes the entries of every university.
+
+        Returns one entry per target profile:
+            {"program_id", "degree_title", "degree_type", "recommendations"}
+        """
+        global _suggestions_cache
+        version = catalog_version()
+        key = (univ_id, top_n_degrees)
+        with _suggestions_lock:
+            cached_version, suggestions = _suggestions_cache
+            if cached_version != version:
+                suggestions = OrderedDict()
+                _suggestions_cache = (version, suggestions)
+            ranked = suggestions.get(key)
+            if ranked is not None:
+                suggestions.move_to_end(key)
+
+        if ranked is None:
+            all_profiles = self._profiles_for(version)
+            if not any(p.get("university_id") == univ_id for p in all_profiles):
+                return [{"info": "No degree profiles found for this university."}]
+            ranked = self._suggest_courses(
+                all_profiles, univ_id, None, top_n_degrees,
+                vectorizer=self._vectorizer_for(version),
+            )
+            with _suggestions_lock:
+                suggestions[key] = ranked
+                if len(suggestions) > _SUGGESTIONS_CACHE_SIZE:
+                    suggestions.popitem(last=False)
 
-        max_freq = max(course_freq.values()) if course_freq else 1
-        target_univ_id = target_degree["university_id"]
+        return [
+            {**entry, "recommendations": self._head(entry["recommendations"], top_n)}
+            for entry in ranked
+        ]
 
-        results = []
-        for i, cname in enumerate(courses_list):
-            skills = course_skills[cname]
-            freq_score = course_freq[cname] / max_freq                       # normalized frequency
-            new_skills = course_specific_skills_map.get(cname, set()) - target_skills
-            compat_skills = skills & target_skills
-
-            # Compatibility: Jaccard-like measure between course skills and target skills
-            intersection_size = len(compat_skills)
-            union_size = len(skills | target_skills)
-            compat_score = intersection_size / union_size if union_size else 0.0
-
-            novelty_score = 1.0 - sims[i]                                     # TF-IDF based novelty (higher => more novel)
-            new_skill_score = len(new_skills) / (len(skills) + 1)             # proportion of new skills relative to course skill set
-
-            # If compatibility is low, significantly reduce the overall score to avoid poor matches
-            compatibility_factor = 1.0 if compat_score >= 0.1 else 0.05
-
-            # Weighted combination of signals — tuned heuristically
-            total_score = round(
-                compatibility_factor * (
-                    0.40 * freq_score +
-                    0.35 * compat_score +
-                    0.15 * new_skill_score +
-                    0.10 * novelty_score
-                ), 3
-            )
+    @staticmethod
+    def _head(recommendations: List[Dict[str, Any]], top_n: int) -> List[Dict[str, Any]]:
+        """The first top_n ranked courses; {"info": ...} placeholders are kept as they are."""
+        if recommendations and "info" in recommendations[0]:
+            return recommendations
+        return recommendations[:max(top_n, 0)]
 
-            # Fetch textual course details, restricting to the target university (so the description is relevant)
-            course_details = self.get_course_details_by_name(cname, target_univ_id)
+    def warm_suggestions(self, top_n: int = 10, top_n_degrees: int = 5) -> None:
+        """
+        Precompute suggest_courses for every university (e.g. at startup), so the
+        per-university endpoint is served from the cache. Only the ids are
+        selected here: the catalog graph is loaded once, by the profile build.
+        """
+        university_ids = self.db.execute(select(University.university_id)).scalars().all()
+        for univ_id in university_ids:
+            self.suggest_courses(univ_id, top_n, top_n_degrees)
 
-            results.append({
-                "course_name": cname,
-                "score": total_score,
-                "new_skills": sorted(list(new_skills)),
-                "compatible_skills": sorted(list(compat_skills)),
-                "description": course_details["description"],
-                "objectives": course_details["objectives"],
-                "learning_outcomes": course_details["learning_outcomes"],
-                "course_content": course_details["course_content"],
-            })
+    def _suggest_courses(
+        self,
+        all_profiles: List[Dict[str, Any]],
+        univ_id: int,
+        top_n: Optional[int],
+        top_n_degrees: int,
+        vectorizer: Optional[TfidfVectorizer] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Uncached suggest_courses over the given profiles (top_n=None ranks every
+        candidate course), using `vectorizer` when given (fitted on all_profiles)
+        instead of fitting one here.
+        """
+        targets = [p for p in all_profiles if p.get("university_id") == univ_id]
+        if not targets:
+            return [{"info": "No degree profiles found for this university."}]
+
+        if vectorizer is None:
+            vectorizer = self.fit_profile_vectorizer(all_profiles)
+        similar_by_target = self.find_similar_degrees_batch(
+            targets, all_profiles, top_n=top_n_degrees, vectorizer=vectorizer
+        )
 
-        # Return top-N courses sorted by score (descending)
-        return sorted(results, key=lambda x: x["score"], reverse=True)[:top_n]
+        return [
+            {
+                "program_id": target.get("program_id"),
+                "degree_title": target.get("degree_title"),
+                "degree_type": target.get("degree_type"),
+                "recommendations": self.suggest_courses_for_degree(
+                    target, similar_degrees, top_n=top_n, vectorizer=vectorizer
+                ),
+            }
+            for target, similar_degrees in zip(targets, similar_by_target)
+        ]
 
     # ==========================================================
     # 4) Suggest courses for a new degree
@@ -384,6 +873,7 @@ class CourseRecommender:
         similar_degrees: List[Dict[str, Any]],
         target_skills: Optional[set] = None,
         top_n: int = 10,
+        vectorizer: Optional[TfidfVectorizer] = None,
     ) -> List[Dict[str, Any]]:
         """
         Generate course suggestions for a NEW degree.
@@ -399,34 +889,12 @@ class CourseRecommender:
         if not similar_degrees:
             return [{"info": "No similar degrees available for recommendation."}]
 
-        if target_skills is None:
-            target_skills = set()
-
-        course_freq = defaultdict(int)
-        course_skills = defaultdict(set)
-        course_specific_skills_map = dict()
+        target_skills = frozenset(target_skills or ())
 
         # Aggregate candidate courses and skills across all similar degrees
-        for deg in similar_degrees:
-            deg_skills = set(deg.get("skills", []))
-            for cname in deg.get("courses", []):
-                if not cname:
-                    continue
-
-                db_course = self.db.query(Course).filter(Course.lesson_name == cname).first()
-                course_specific_skills = set()
-                if db_course:
-                    for cs in getattr(db_course, "skills", []):
-                        if getattr(cs, "skill", None):
-                            skill_name = (cs.skill.skill_name or "").strip()
-                            if skill_name:
-                                course_specific_skills.add(skill_name)
-
-                if course_specific_skills or deg_skills:
-                    total_skills = deg_skills.union(course_specific_skills)
-                    course_freq[cname] += 1
-                    course_skills[cname].update(total_skills)
-                    course_specific_skills_map[cname] = course_specific_skills
+        course_freq, course_skills, course_specific_skills_map = self._aggregate_candidate_courses(
+            similar_degrees
+        )
 
         if not course_freq:
             logger.info("No new courses found for recommendation.")
@@ -436,53 +904,20 @@ class CourseRecommender:
         courses_list = list(course_freq.keys())
         course_docs = [" ".join(course_skills[c]) for c in courses_list]
         target_doc = " ".join(target_skills)
-        docs = course_docs + [target_doc]
-
-        if all(not doc.strip() for doc in docs):
-            logger.info("Recommendation failed due to lack of skill text for comparison.")
-            return [{"info": "Recommendation failed due to lack of skill text for comparison."}]
-
-        vectorizer = TfidfVectorizer()
-        vectors = vectorizer.fit_transform(docs)
-        sims = cosine_similarity(vectors[-1], vectors[:-1]).flatten()
-
-        max_freq = max(course_freq.values()) if course_freq else 1
-
-        results = []
-        for i, cname in enumerate(courses_list):
-            skills = course_skills[cname]
-            freq_score = course_freq[cname] / max_freq
-            new_skills = course_specific_skills_map.get(cname, set()) - target_skills
-            compat_skills = skills & target_skills
-
-            intersection_size = len(compat_skills)
-            union_size = len(skills | target_skills)
-            compat_score = intersection_size / union_size if union_size else 0.0
-            novelty_score = 1.0 - sims[i]
-            new_skill_score = len(new_skills) / (len(skills) + 1)
-            compatibility_factor = 1.0 if compat_score >= 0.1 else 0.05
-
-            total_score = round(
-                compatibility_factor * (
-                    0.40 * freq_score +
-                    0.35 * compat_score +
-                    0.15 * new_skill_score +
-                    0.10 * novelty_score
-                ), 3
-            )
-
-            # Course details are retrieved without restricting university (new degree context)
-            course_details = self.get_course_details_by_name(cname, target_univ_id=None)
-
-            results.append({
-                "course_name": cname,
-                "score": total_score,
-                "new_skills": sorted(list(new_skills)),
-                "compatible_skills": sorted(list(compat_skills)),
-                "description": course_details["description"],
-                "objectives": course_details["objectives"],
-                "learning_outcomes": course_details["learning_outcomes"],
-                "course_content": course_details["course_content"],
-            })
 
-        return sorted(results, key=lambda x: x["score"], reverse=True)[:top_n]
+        if not target_doc.strip():
+            if all(not doc.strip() for doc in course_docs):
+                logger.info("Recommendation failed due to lack of skill text for comparison.")
+                return [{"info": "Recommendation failed due to lack of skill text for comparison."}]
+            # Cold start (no target skills yet): zero similarity to every course, so
+            # the ranking rests on frequency and new skills and TF-IDF is skipped
+            sims = np.zeros(len(courses_list))
+        else:
+            vectors = self._tfidf(course_docs + [target_doc], vectorizer)
+            sims = self._target_similarities(vectors)
+
+        # Course details are retrieved without restricting university (new degree context)
+        return self._rank_courses(
+            courses_list, course_freq, course_skills, course_specific_skills_map,
+            target_skills, sims, top_n, target_univ_id=None,
+        )
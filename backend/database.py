@@ -3,8 +3,8 @@
 # =============================================
 
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, scoped_session
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
 from backend.models import Base  # Υποθέτουμε ότι το Base εισάγεται από το models.py
 
 # ============================
@@ -24,12 +24,39 @@ DATABASE_URL = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB
 # ============================
 # Engine
 # ============================
-engine = create_engine(DATABASE_URL, echo=False, pool_pre_ping=True)
+# Pool για ταυτόχρονα requests (5 + 10 overflow ανά process· με πολλούς uvicorn workers
+# το σύνολο πρέπει να μένει κάτω από το max_connections της MySQL, 151 από προεπιλογή).
+# Ρυθμίζεται με DATABASE_POOL_SIZE / DATABASE_MAX_OVERFLOW. Το LIFO κρατά λίγες συνδέσεις "ζεστές"
+# και το pool_recycle ανανεώνει τις συνδέσεις πριν τις κλείσει η MySQL λόγω αδράνειας.
+engine = create_engine(
+    DATABASE_URL,
+    echo=False,
+    pool_pre_ping=True,
+    pool_size=int(os.getenv("DATABASE_POOL_SIZE", "5")),
+    max_overflow=int(os.getenv("DATABASE_MAX_OVERFLOW", "10")),
+    pool_recycle=1800,
+    pool_use_lifo=True,
+    connect_args={"charset": "utf8mb4"},
+)
+
+
+# Ρυθμίσεις ανά σύνδεση: εφαρμόζονται μία φορά, όταν ανοίγει κάθε σύνδεση του pool.
+# Η MySQL κόβει τα αποτελέσματα του GROUP_CONCAT στα 1024 bytes από προεπιλογή
+# (το χρησιμοποιεί το ευρετήριο μαθημάτων του student_recommender).
+@event.listens_for(engine, "connect")
+def _set_session_options(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("SET SESSION group_concat_max_len = 1048576")
+    finally:
+        cursor.close()
 
 # ============================
 # Session factory
 # ============================
-SessionLocal = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
+# Ένα session ανά request (το διαχειρίζεται το get_db), χωρίς thread-local scoping.
+# expire_on_commit=False: τα αντικείμενα δεν ξαναφορτώνονται από τη βάση μετά το commit.
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, expire_on_commit=False)
 
 # ============================
 # Δημιουργία όλων των πινάκων
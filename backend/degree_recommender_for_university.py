@@ -1,10 +1,14 @@
 # backend/core.py
-from typing import List, Dict, Any, Optional, Set
-from sqlalchemy.orm import Session
-from backend.models import University
+from typing import List, Dict, Any, FrozenSet, NamedTuple, Optional, Set, Tuple
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload
+from backend.models import University, Course, CourseSkill
+from backend.catalog import catalog_version
+from backend.ranking import top_n_indices
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from collections import defaultdict
+from sklearn.metrics.pairwise import linear_kernel
+from collections import Counter, defaultdict
 import json
 import re
 import logging
@@ -12,6 +16,26 @@ import math
 
 logger = logging.getLogger(__name__)
 
+# Degree title clean-up and the simple degree type classifier
+_TITLE_CLEAN_RE = re.compile(r"[^a-zA-Z0-9 \-&]")
+_MASTER_RE = re.compile(r"\b(master|msc|ma|m\.sc)\b")
+_PHD_RE = re.compile(r"\b(phd|doctorate|doctoral)\b")
+# TfidfVectorizer's default token pattern, for the skill term weights
+_TOKEN_RE = re.compile(r"(?u)\b\w\w+\b")
+
+
+class _UniversityRow(NamedTuple):
+    """The University columns the recommender reports, detached from any session."""
+    university_id: int
+    university_name: str
+    country: str
+
+
+# Catalog-derived state shared by every UniversityRecommender of the process (university
+# rows, profiles, TF-IDF fit, skill bitmasks): (catalog version, state). Rebuilt when
+# the version changes; only used when caching is enabled. Never mutated once published.
+_shared_state: Tuple[Optional[tuple], Optional[Dict[str, Any]]] = (None, None)
+
 
 class UniversityRecommender:
     """
@@ -49,6 +73,20 @@ class UniversityRecommender:
         self.db = db
         self._profile_cache: Dict[int, Dict[str, Any]] = {}
         self.cache_enabled = cache_enabled
+        # Every university, loaded once per instance (or per catalog version when
+        # caching is enabled) by _warm_all_profiles
+        self._all_universities: Optional[List[_UniversityRow]] = None
+        # Corpus-wide TF-IDF over the university profiles (see _fit_global_tfidf):
+        # (vectorizer, {university_id: row}, matrix), or None before the first fit
+        self._tfidf: Optional[Tuple[Optional[TfidfVectorizer], Dict[int, int], Any]] = None
+        # Lowercased skill name -> bit position, and each university's skill bitmask
+        self._skill_vocab: Dict[str, int] = {}
+        self._skill_bits: Dict[int, int] = {}
+        # True while the caches above are the published shared state (read-only)
+        self._state_shared = False
+        # _get_degree_skills_similarity results, keyed by its (hashable) arguments;
+        # per instance, never part of the shared state
+        self._degree_skills_cache: Dict[Tuple[Tuple[int, ...], str, FrozenSet[str]], List[Dict[str, Any]]] = {}
 
         # Default scoring weights
         default = {
@@ -72,6 +110,14 @@ class UniversityRecommender:
         else:
             self.weights = default
 
+    # Programs and courses -> skills -> skill are eager-loaded with selectinload (one
+    # IN query per level, no row explosion on the skill joins), so building a profile
+    # walks the relationships without lazy loads.
+    _UNIVERSITY_LOAD_OPTIONS = (
+        selectinload(University.programs),
+        selectinload(University.courses).selectinload(Course.skills).selectinload(CourseSkill.skill),
+    )
+
     # -------------------------------------------------------------------------
     # Build university profile (skills, courses, degrees)
     # -------------------------------------------------------------------------
@@ -90,14 +136,97 @@ class UniversityRecommender:
         if self.cache_enabled and university_id in self._profile_cache:
             return self._profile_cache[university_id]
 
-        university = (
-            self.db.query(University)
-            .filter_by(university_id=university_id)
-            .first()
-        )
+        # Session.get returns an already loaded university from the identity map
+        # without a query (see _warm_all_profiles)
+        university = self.db.get(University, university_id, options=self._UNIVERSITY_LOAD_OPTIONS)
         if not university:
             return None
 
+        profile = self._profile_from_orm(university)
+        if self.cache_enabled:
+            self._own_caches()
+            self._profile_cache[university_id] = profile
+
+        return profile
+
+    def warmup(self) -> None:
+        """
+        Build every university profile, the global TF-IDF fit and the skill bitmasks
+        for the current catalog (e.g. at startup), so the first degree / similarity
+        request starts from the shared state.
+        """
+        self._warm_all_profiles()
+
+    def _warm_all_profiles(self) -> List[_UniversityRow]:
+        """
+        Load every university (eager-loaded, a fixed number of queries) and build the
+        missing profiles, the global TF-IDF fit and the skill bitmasks in one pass, so
+        later build_university_profile calls are cache lookups. Returns the universities.
+
+        With caching enabled the result is shared process-wide until the catalog
+        version changes (see backend.catalog), so repeat requests (on any instance)
+        issue no query. Shared state is complete before it is published and never
+        mutated after: an instance that needs to add to it (e.g. a university
+        created elsewhere since) copies its caches first (_own_caches).
+        """
+        global _shared_state
+        if self._all_universities is not None:
+            return self._all_universities
+
+        version = catalog_version() if self.cache_enabled else None
+        if version is not None and _shared_state[0] == version:
+            self._use_state(_shared_state[1])
+            return self._all_universities
+
+        universities = self.db.execute(
+            select(University).options(*self._UNIVERSITY_LOAD_OPTIONS)
+        ).scalars().all()
+        self._all_universities = [
+            _UniversityRow(u.university_id, u.university_name, u.country) for u in universities
+        ]
+        if self.cache_enabled:
+            for university in universities:
+                if university.university_id not in self._profile_cache:
+                    self._profile_cache[university.university_id] = self._profile_from_orm(university)
+
+        if version is not None:
+            self._fit_global_tfidf()
+            for university_id, profile in self._profile_cache.items():
+                self._university_skill_bits(university_id, profile)
+            _shared_state = (version, {
+                "universities": self._all_universities,
+                "profiles": self._profile_cache,
+                "tfidf": self._tfidf,
+                "skill_vocab": self._skill_vocab,
+                "skill_bits": self._skill_bits,
+            })
+            self._state_shared = True
+        return self._all_universities
+
+    def _use_state(self, state: Dict[str, Any]) -> None:
+        """Point this instance's caches at a shared state built by _warm_all_profiles."""
+        self._all_universities = state["universities"]
+        self._profile_cache = state["profiles"]
+        self._tfidf = state["tfidf"]
+        self._skill_vocab = state["skill_vocab"]
+        self._skill_bits = state["skill_bits"]
+        self._state_shared = True
+
+    def _own_caches(self) -> None:
+        """Replace the shared profile / skill caches by private copies before writing to them."""
+        if self._state_shared:
+            self._profile_cache = dict(self._profile_cache)
+            self._skill_vocab = dict(self._skill_vocab)
+            self._skill_bits = dict(self._skill_bits)
+            self._state_shared = False
+
+    @staticmethod
+    def _profile_from_orm(university: University) -> Dict[str, Any]:
+        """
+        Build the profile dict (skills, skills_raw_names and their lowercased forms,
+        courses, degrees) of a loaded University from its relationships. Issues
+        no queries when the relationships are eager-loaded.
+        """
         profile = {
             "skills": set(),
             "skills_raw_names": set(),
@@ -126,11 +255,15 @@ class UniversityRecommender:
             if not titles:
                 continue
 
-            # Normalize title lists
+            # Normalize title lists. The JSON column already decodes to a list; only
+            # legacy rows holding a JSON-encoded array as text still need parsing.
             if isinstance(titles, str):
-                try:
-                    titles = json.loads(titles)
-                except Exception:
+                if titles.lstrip().startswith("["):
+                    try:
+                        titles = json.loads(titles)
+                    except ValueError:
+                        titles = [titles]
+                else:
                     titles = [titles]
             if not isinstance(titles, list):
                 titles = [titles]
@@ -138,21 +271,77 @@ class UniversityRecommender:
             for title in titles:
                 if not title:
                     continue
-                clean_title = re.sub(r"[^a-zA-Z0-9 \-&]", "", str(title)).strip()
+                clean_title = _TITLE_CLEAN_RE.sub("", str(title)).strip()
                 if clean_title:
                     profile["degrees"].add(clean_title)
 
         # Sort to maintain deterministic structure
         profile["skills"] = sorted(profile["skills"])
-        profile["skills_raw_names"] = sorted(list(profile["skills_raw_names"]))
-        profile["courses"] = sorted(list({c for c in profile["courses"] if c}))
+        profile["skills_raw_names"] = sorted(profile["skills_raw_names"])
+        profile["courses"] = sorted({c for c in profile["courses"] if c})
+        # Set view of the degrees for membership tests, next to the sorted list
+        profile["degrees_set"] = frozenset(profile["degrees"])
         profile["degrees"] = sorted(profile["degrees"])
-
-        if self.cache_enabled:
-            self._profile_cache[university_id] = profile
+        # Lowercased once here for the case-insensitive skill comparisons; the list is
+        # aligned with skills_raw_names so callers can zip the two
+        profile["skills_raw_names_lower"] = [s.lower() for s in profile["skills_raw_names"]]
+        profile["skills_raw_names_lc"] = frozenset(profile["skills_raw_names_lower"])
 
         return profile
 
+    @staticmethod
+    def _profile_text(profile: Dict[str, Any]) -> str:
+        """Skills, courses and degree titles of a profile joined into one TF-IDF document."""
+        return " ".join(
+            " ".join(profile[key]) for key in ("skills", "courses", "degrees") if profile[key]
+        ).strip()
+
+    def _fit_global_tfidf(self) -> Tuple[Optional[TfidfVectorizer], Dict[int, int], Any]:
+        """
+        Fit one TF-IDF vectorizer on the profile text of every university and keep
+        the resulting matrix with each university's row index (universities without
+        text get no row). Fitted once per instance (or per catalog version, see
+        _warm_all_profiles) and reused by every similarity computation, instead of a
+        fresh vocabulary/IDF fit per call.
+
+        :return: (vectorizer, {university_id: row}, matrix); the vectorizer and
+                 matrix are None when no university has any text
+        """
+        if self._tfidf is None:
+            rows: Dict[int, int] = {}
+            corpus: List[str] = []
+            for university in self._warm_all_profiles():
+                profile = self.build_university_profile(university.university_id)
+                text = self._profile_text(profile) if profile else ""
+                if text:
+                    rows[university.university_id] = len(corpus)
+                    corpus.append(text)
+
+            vectorizer, matrix = None, None
+            if corpus:
+                vectorizer = TfidfVectorizer(dtype=np.float32)
+                matrix = vectorizer.fit_transform(corpus)
+            self._tfidf = (vectorizer, rows, matrix)
+        return self._tfidf
+
+    def _skill_mask(self, skill_names_lc) -> int:
+        """
+        Bitmask of already lowercased skill names over the instance's skill vocabulary,
+        so overlap / union sizes are popcounts of `&` / `|` instead of set algebra.
+        """
+        mask = 0
+        for name in skill_names_lc:
+            mask |= 1 << self._skill_vocab.setdefault(name, len(self._skill_vocab))
+        return mask
+
+    def _university_skill_bits(self, university_id: int, profile: Dict[str, Any]) -> int:
+        """_skill_mask of a university's lowercased skill names, computed once per university."""
+        bits = self._skill_bits.get(university_id)
+        if bits is None:
+            self._own_caches()
+            bits = self._skill_bits[university_id] = self._skill_mask(profile["skills_raw_names_lc"])
+        return bits
+
     # -------------------------------------------------------------------------
     # Find similar universities based on skills + courses + degrees
     # -------------------------------------------------------------------------
@@ -164,67 +353,37 @@ class UniversityRecommender:
         :param target_univ_id: ID of the target university
         :param top_n: Number of results to return
         """
+        # All universities and their profiles are loaded in one pass up front
+        universities = self._warm_all_profiles()
         target_profile = self.build_university_profile(target_univ_id)
         if not target_profile:
             return []
 
-        # Fetch remaining universities
-        all_univs = (
-            self.db.query(University)
-            .filter(University.university_id != target_univ_id)
-            .all()
-        )
-
-        docs = []
-        valid_univs = []
-
-        # Construct text representations for comparison
-        for u in all_univs:
-            p = self.build_university_profile(getattr(u, "university_id"))
-            if not p:
-                continue
-
-            parts = []
-            if p["skills"]:
-                parts.append(" ".join(p["skills"]))
-            if p["courses"]:
-                parts.append(" ".join(p["courses"]))
-            if p["degrees"]:
-                parts.append(" ".join(p["degrees"]))
-
-            combined_text = " ".join(parts).strip()
-            if combined_text:
-                docs.append(combined_text)
-                valid_univs.append(u)
-
-        if not docs:
-            return []
-
-        # Target university text representation
-        target_parts = []
-        if target_profile["skills"]:
-            target_parts.append(" ".join(target_profile["skills"]))
-        if target_profile["courses"]:
-            target_parts.append(" ".join(target_profile["courses"]))
-        if target_profile["degrees"]:
-            target_parts.append(" ".join(target_profile["degrees"]))
-
-        target_text = " ".join(target_parts).strip()
-
-        # Compute cosine similarity
+        # Cosine similarity against the corpus-wide TF-IDF matrix; the rows are
+        # L2-normalized, so it is the plain inner product (linear_kernel)
         try:
-            vectorizer = TfidfVectorizer()
-            vectors = vectorizer.fit_transform(docs + [target_text])
-            sims = cosine_similarity(vectors[-1], vectors[:-1]).flatten()
+            _, rows, matrix = self._fit_global_tfidf()
         except Exception as e:
             logger.exception("Error computing similarity for universities: %s", e)
             return []
 
-        ranked = sorted(
-            zip(valid_univs, sims),
-            key=lambda x: x[1],
-            reverse=True
-        )[:top_n]
+        # Universities without any text have no row and are not compared
+        valid_univs = [
+            u for u in universities
+            if u.university_id != target_univ_id and u.university_id in rows
+        ]
+        if not valid_univs:
+            return []
+
+        candidates = matrix[[rows[u.university_id] for u in valid_univs]]
+        target_row = rows.get(target_univ_id)
+        if target_row is None:
+            # An empty target is equally dissimilar to every university
+            sims = np.zeros(len(valid_univs))
+        else:
+            sims = linear_kernel(matrix[target_row], candidates).ravel()
+
+        ranked = [(valid_univs[i], sims[i]) for i in top_n_indices(sims, top_n)]
 
         return [
             {
@@ -241,6 +400,23 @@ class UniversityRecommender:
     # -------------------------------------------------------------------------
     def _get_degree_skills_similarity(
         self, similar_univ_ids: List[int], target_degree: str, target_skills_raw: Set[str]
+    ) -> List[Dict[str, Any]]:
+        """
+        Memoized _compute_degree_skills_similarity (when caching is enabled).
+        The returned list is shared between calls; treat it as read-only.
+        """
+        if not self.cache_enabled:
+            return self._compute_degree_skills_similarity(similar_univ_ids, target_degree, target_skills_raw)
+
+        key = (tuple(similar_univ_ids), target_degree, frozenset(target_skills_raw))
+        if key not in self._degree_skills_cache:
+            self._degree_skills_cache[key] = self._compute_degree_skills_similarity(
+                similar_univ_ids, target_degree, target_skills_raw
+            )
+        return self._degree_skills_cache[key]
+
+    def _compute_degree_skills_similarity(
+        self, similar_univ_ids: List[int], target_degree: str, target_skills_raw: Set[str]
     ) -> List[Dict[str, Any]]:
         """
         Computes recommended skill additions for a specific degree by analyzing
@@ -261,12 +437,12 @@ class UniversityRecommender:
         # Collect skills from universities offering the same degree
         for univ_id in similar_univ_ids:
             profile = self.build_university_profile(univ_id)
-            if not profile or target_degree not in profile["degrees"]:
+            if not profile or target_degree not in profile["degrees_set"]:
                 continue
 
             filtered = [
-                s for s in profile["skills_raw_names"]
-                if s.lower() not in target_skills_lc
+                s for s, s_lc in zip(profile["skills_raw_names"], profile["skills_raw_names_lower"])
+                if s_lc not in target_skills_lc
             ]
 
             all_skills.extend(filtered)
@@ -276,13 +452,11 @@ class UniversityRecommender:
         if not skill_counter:
             return []
 
-        # Compute TF-IDF weighting
-        try:
-            vectorizer = TfidfVectorizer(lowercase=True)
-            vectors = vectorizer.fit_transform([" ".join(all_skills)])
-            weights = dict(zip(vectorizer.get_feature_names_out(), vectors.toarray()[0]))
-        except Exception:
-            weights = {}
+        # Compute TF-IDF weighting. Over a single document every IDF is 1, so this is
+        # the L2-normalized term frequency of the concatenated skills
+        term_counts = Counter(_TOKEN_RE.findall(" ".join(all_skills).lower()))
+        norm = math.sqrt(sum(v * v for v in term_counts.values())) or 1.0
+        weights = {term: count / norm for term, count in term_counts.items()}
 
         max_count = max(skill_counter.values())
         raw_scores = []
@@ -299,18 +473,16 @@ class UniversityRecommender:
         max_s = max(v for _, v in raw_scores)
         spread = max(max_s - min_s, 1.0)
 
-        ranked_skills = []
+        final_scores = []
         for skill, val in raw_scores:
             normalized = (val - min_s) / spread
             boosted = math.pow(normalized, 0.8)
-            final_score = round(0.7 + 0.25 * boosted, 3)
-            ranked_skills.append({
-                "skill_name": skill,
-                "skill_score": round(final_score, 3)
-            })
+            final_scores.append(round(0.7 + 0.25 * boosted, 3))
 
-        ranked_skills.sort(key=lambda x: x["skill_score"], reverse=True)
-        return ranked_skills[:5]
+        return [
+            {"skill_name": raw_scores[i][0], "skill_score": final_scores[i]}
+            for i in top_n_indices(final_scores, 5)
+        ]
 
     # -------------------------------------------------------------------------
     # Recommend degrees + enriched skills
@@ -329,6 +501,7 @@ class UniversityRecommender:
         :param target_univ_id: The university to enrich
         :param top_n: Max number of degrees to return
         """
+        self._warm_all_profiles()
         similar_univs = self.find_similar_universities(target_univ_id, top_n=10)
         target_profile = self.build_university_profile(target_univ_id)
 
@@ -337,68 +510,86 @@ class UniversityRecommender:
 
         similar_univ_ids = [u["university_id"] for u in similar_univs]
         target_skills_raw = set(target_profile["skills_raw_names"])
-        target_degrees = set(target_profile["degrees"])
+        target_degrees = target_profile["degrees_set"]
         target_text = " ".join(
             target_profile["skills"] +
             target_profile["courses"] +
             target_profile["degrees"]
         )
 
-        degree_texts = {}
-        degree_freq = defaultdict(int)
-        degree_compat = defaultdict(float)
-        degree_skill_bonus = defaultdict(int)
-
-        # Extract features from similar universities
+        # First pass: enumerate the candidate degrees so the per-degree
+        # accumulators can live in flat arrays instead of dicts of strings
+        candidates = []
         for u in similar_univs:
             p = self.build_university_profile(u["university_id"])
-            if not p:
-                continue
+            if p:
+                new_degrees = [d for d in p["degrees"] if d not in target_degrees]
+                candidates.append((u["university_id"], p, new_degrees))
 
-            new_degrees = set(p["degrees"]) - target_degrees
-            new_skills = set(p["skills"]) - set(target_profile["skills"])
+        degree_to_idx: Dict[str, int] = {}
+        for _, _, new_degrees in candidates:
+            for deg in new_degrees:
+                degree_to_idx.setdefault(deg, len(degree_to_idx))
 
-            combined_text = " ".join(p["skills"] + p["courses"])
+        if not degree_to_idx:
+            return []
 
-            for deg in new_degrees:
-                degree_freq[deg] += 1
-                degree_texts[deg] = degree_texts.get(deg, "") + " " + combined_text
+        n_degrees = len(degree_to_idx)
+        degree_freq = np.zeros(n_degrees, dtype=np.int32)
+        degree_compat = np.zeros(n_degrees, dtype=np.float64)
+        degree_skill_bonus = np.zeros(n_degrees, dtype=np.int32)
+        degree_texts: List[List[str]] = [[] for _ in range(n_degrees)]
 
-                p_skills_raw = {s.lower() for s in p["skills_raw_names"]}
-                target_skills_lc = {s.lower() for s in target_profile["skills_raw_names"]}
+        # Loop invariants: the target's skill set and skill bitmask
+        target_skills_set = frozenset(target_profile["skills"])
+        target_bits = self._university_skill_bits(target_univ_id, target_profile)
 
-                overlap = len(p_skills_raw & target_skills_lc)
-                union_count = len(p_skills_raw | target_skills_lc)
-                compat = overlap / (union_count + 1)
+        # Extract features from similar universities
+        for univ_id, p, new_degrees in candidates:
+            # p["skills"] holds unique names, so counting the misses equals len(set difference)
+            new_skill_count = sum(1 for skill in p["skills"] if skill not in target_skills_set)
 
-                degree_compat[deg] += compat
-                degree_skill_bonus[deg] += len(new_skills)
+            combined_text = " ".join(p["skills"] + p["courses"])
 
-        if not degree_texts:
-            return []
+            # Case-insensitive skill compatibility with the target (same for every degree)
+            p_bits = self._university_skill_bits(univ_id, p)
+            overlap = (p_bits & target_bits).bit_count()
+            union_count = (p_bits | target_bits).bit_count()
+            compat = overlap / (union_count + 1)
 
-        degrees = list(degree_texts.keys())
-        docs = [degree_texts[d] for d in degrees] + [target_text]
+            for deg in new_degrees:
+                idx = degree_to_idx[deg]
+                degree_freq[idx] += 1
+                degree_texts[idx].append(combined_text)
+                degree_compat[idx] += compat
+                degree_skill_bonus[idx] += new_skill_count
+
+        degrees = list(degree_to_idx)
+        docs = [" ".join(texts) for texts in degree_texts] + [target_text]
 
         try:
-            vectorizer = TfidfVectorizer()
-            vectors = vectorizer.fit_transform(docs)
-            sims = cosine_similarity(vectors[-1], vectors[:-1]).flatten()
+            # Transform with the corpus-wide vectorizer (its vocabulary and IDF come
+            # from the university profiles) instead of fitting on these docs
+            vectorizer, _, _ = self._fit_global_tfidf()
+            if vectorizer is None:
+                raise ValueError("no university profile text to fit TF-IDF on")
+            vectors = vectorizer.transform(docs)
+            sims = linear_kernel(vectors[-1], vectors[:-1]).ravel()
         except Exception as e:
             logger.exception("Error computing degree similarities: %s", e)
             sims = [0.0] * len(degrees)
 
         final = []
 
-        max_freq = max(degree_freq.values()) if degree_freq else 1
-        max_skill_bonus = max(degree_skill_bonus.values()) if degree_skill_bonus else 1
+        max_freq = int(degree_freq.max())
+        max_skill_bonus = int(degree_skill_bonus.max())
 
         # Build final degree scoring
         for i, deg in enumerate(degrees):
-            freq_score = degree_freq[deg] / max_freq
+            freq_score = int(degree_freq[i]) / max_freq
             novelty_score = max(0.0, min(1.0, 1.0 - float(sims[i])))
-            compat_score = degree_compat[deg] / degree_freq[deg]
-            skill_enrichment_score = degree_skill_bonus[deg] / max_skill_bonus
+            compat_score = float(degree_compat[i]) / int(degree_freq[i])
+            skill_enrichment_score = int(degree_skill_bonus[i]) / max_skill_bonus if max_skill_bonus else 0.0
 
             total_score = (
                 self.weights["frequency"] * freq_score +
@@ -409,28 +600,29 @@ class UniversityRecommender:
 
             # Simple degree type classifier
             deg_lower = deg.lower()
-            if re.search(r'\b(master|msc|ma|m\.sc|msc)\b', deg_lower):
+            if _MASTER_RE.search(deg_lower):
                 degree_type = 'MSc/MA'
-            elif re.search(r'\b(phd|doctorate|doctoral)\b', deg_lower):
+            elif _PHD_RE.search(deg_lower):
                 degree_type = 'PhD'
             else:
                 degree_type = 'BSc/BA'
 
-            top_skills = self._get_degree_skills_similarity(
-                similar_univ_ids, deg, target_skills_raw
-            )
-
             final.append({
                 "degree": deg,
                 "score": round(total_score, 3),
                 "degree_type": degree_type,
-                "top_skills": top_skills,
                 "metrics": {
                     "frequency": round(freq_score * 100),
                     "compatibility": round(compat_score * 100),
-                    "skill_enrichment": int(degree_skill_bonus[deg]),
+                    "skill_enrichment": int(degree_skill_bonus[i]),
                     "novelty": round(novelty_score * 100)
                 }
             })
 
-        return sorted(final, key=lambda x: x['score'], reverse=True)[:top_n]
+        # Keep the top_n degrees and compute the (costly) skill breakdown only for them
+        top_degrees = [final[i] for i in top_n_indices([d["score"] for d in final], top_n)]
+        for entry in top_degrees:
+            entry["top_skills"] = self._get_degree_skills_similarity(
+                similar_univ_ids, entry["degree"], target_skills_raw
+            )
+        return top_degrees
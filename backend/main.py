@@ -1,7 +1,10 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from backend.database import init_db
+from backend.database import init_db, SessionLocal
+from backend.course_recommender_for_university import CourseRecommender
+from backend.student_recommender import CourseRecommender as CourseRecommenderV3
+from backend.degree_recommender_for_university import UniversityRecommender
 from backend.routers import  recommendations, electives, filters
 
 app = FastAPI(
@@ -32,6 +35,36 @@ def on_startup():
     except Exception as e:
         print(f"❌ Error initializing database: {e}")
 
+    # Precompute the per-university course suggestions so requests read them from cache
+    db = SessionLocal()
+    try:
+        CourseRecommender(db).warm_suggestions()
+        print("Course suggestions precomputed.")
+    except Exception as e:
+        print(f"❌ Error precomputing course suggestions: {e}")
+    finally:
+        db.close()
+
+    # Build the program / standalone-course similarity indexes used by /recommend/personalized
+    db = SessionLocal()
+    try:
+        CourseRecommenderV3(db).warmup()
+        print("Personalized recommendation indexes built.")
+    except Exception as e:
+        print(f"❌ Error building personalized recommendation indexes: {e}")
+    finally:
+        db.close()
+
+    # Build the university profiles and TF-IDF fit shared by the degree / similarity endpoints
+    db = SessionLocal()
+    try:
+        UniversityRecommender(db).warmup()
+        print("University profiles built.")
+    except Exception as e:
+        print(f"❌ Error building university profiles: {e}")
+    finally:
+        db.close()
+
 # ----------------------------------
 # ROUTES (ΣΩΣΤΑ prefix)
 # ----------------------------------
@@ -13,7 +13,7 @@
 
 from sqlalchemy import (
     Column, Integer, String, Text, Enum, JSON, ForeignKey, TIMESTAMP,
-    UniqueConstraint, CheckConstraint, text
+    UniqueConstraint, CheckConstraint, Index, func, text
 )
 from sqlalchemy.orm import relationship, declarative_base
 
@@ -134,6 +134,11 @@ class Skill(Base):
     courses = relationship("CourseSkill", back_populates="skill", cascade="all, delete-orphan")
     occupations = relationship("SkillOccupation", back_populates="skill", cascade="all, delete-orphan")
 
+# Functional index for the case-insensitive skill lookups (lower(skill_name) IN (...)).
+# Needs MySQL 8.0.13+ (functional key parts); create_all only adds it to new databases,
+# existing ones need CREATE INDEX ix_skill_name_lower ON Skill ((lower(skill_name))).
+Index("ix_skill_name_lower", func.lower(Skill.skill_name))
+
 # ============================================================
 #  COURSE ↔ SKILL (πολλα-προς-πολλά)
 # ============================================================
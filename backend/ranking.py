@@ -0,0 +1,30 @@
+# backend/ranking.py
+# ------------------------------------------------------------
+# Shared helpers for ranking scored candidates in the recommenders.
+# ------------------------------------------------------------
+
+import numpy as np
+
+
+def top_n_indices(scores: np.ndarray, top_n: int) -> np.ndarray:
+    """
+    Return the indices of the `top_n` highest scores, best first.
+
+    Uses np.partition to select the winners in O(N) and only sorts those,
+    instead of sorting every candidate. Ties keep their original order, the
+    same as a stable `sorted(..., reverse=True)[:top_n]`.
+    """
+    scores = np.asarray(scores)
+    n = scores.shape[0]
+    if top_n <= 0 or n == 0:
+        return np.empty(0, dtype=np.intp)
+    if top_n < n:
+        # Score of the top_n-th best candidate; everything above it is a winner
+        # and the remaining slots go to the earliest candidates tied with it.
+        threshold = -np.partition(-scores, top_n - 1)[top_n - 1]
+        above = np.flatnonzero(scores > threshold)
+        tied = np.flatnonzero(scores == threshold)[: top_n - above.size]
+        idx = np.sort(np.concatenate((above, tied)))
+    else:
+        idx = np.arange(n)
+    return idx[np.argsort(-scores[idx], kind="stable")]
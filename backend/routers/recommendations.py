@@ -1,6 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException, Path
+from fastapi import APIRouter, Depends, HTTPException, Path, Query
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any
 from urllib.parse import unquote
 import logging
 
@@ -22,7 +21,7 @@ router = APIRouter()
 )
 async def recommend_courses_for_new_degree(
     degree_name: str = Path(..., description="URL-encoded name of the new degree."),
-    top_n_courses: int = 10,
+    top_n_courses: int = Query(10, ge=1, description="Number of courses to return."),
     db: Session = Depends(get_db)
 ):
     """
@@ -33,25 +32,18 @@ async def recommend_courses_for_new_degree(
         decoded_degree_name = unquote(degree_name).strip()
         recommender = CourseRecommenderV2(db)
 
-        logger.info(f"Request for new degree_name='{decoded_degree_name}'")
+        logger.info("Request for new degree_name='%s'", decoded_degree_name)
 
-        # 1️⃣ Gather all degree profiles from all universities
-        all_univs = recommender.get_all_universities()
-        all_profiles: List[Dict[str, Any]] = []
-        for u in all_univs:
-            profiles = recommender.build_degree_profiles(u.university_id)
-            if profiles:
-                all_profiles.extend(profiles)
+        # 1️⃣ Gather all degree profiles from all universities (with their shared TF-IDF fit)
+        all_profiles, vectorizer = recommender.get_all_profiles_with_vectorizer()
 
         if not all_profiles:
             logger.warning("No degree profiles found in any university.")
             raise HTTPException(status_code=404, detail="No degree profiles found in any university.")
 
         # 2️⃣ Find similar degrees by matching normalized degree name
-        similar_degrees = [
-            p for p in all_profiles
-            if recommender.normalize_name(p.get("degree_title")) == recommender.normalize_name(decoded_degree_name)
-        ]
+        target_norm = recommender.normalize_name(decoded_degree_name)
+        similar_degrees = [p for p in all_profiles if p.get("norm_title") == target_norm]
 
         # Fallback to all profiles if no exact match
         if not similar_degrees:
@@ -68,10 +60,11 @@ async def recommend_courses_for_new_degree(
             result = recommender.suggest_courses_for_new_degree(
                 similar_degrees=similar_degrees,
                 target_skills=all_skills,
-                top_n=top_n_courses
+                top_n=top_n_courses,
+                vectorizer=vectorizer
             )
         except Exception as e:
-            logger.error(f"Error in suggest_courses_for_new_degree: {e}")
+            logger.error("Error in suggest_courses_for_new_degree: %s", e)
             raise HTTPException(status_code=500, detail="Course recommendation failed due to internal error.")
 
         # 5️⃣ Format final recommendations
@@ -101,7 +94,7 @@ async def recommend_courses_for_new_degree(
     except HTTPException:
         raise
     except Exception as e:
-        logger.exception(f"Unexpected error in recommend_courses_for_new_degree: {e}")
+        logger.exception("Unexpected error in recommend_courses_for_new_degree: %s", e)
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {e}")
 
 
@@ -113,7 +106,7 @@ async def recommend_courses_for_new_degree(
 async def recommend_courses_by_name_safe(
     university_id: int = Path(..., description="University ID"),
     degree_name: str = Path(..., description="URL-encoded name of the degree"),
-    top_n_courses: int = 10,
+    top_n_courses: int = Query(10, ge=1, description="Number of courses to return."),
     db: Session = Depends(get_db)
 ):
     """
@@ -123,28 +116,21 @@ async def recommend_courses_by_name_safe(
         decoded_degree_name = unquote(degree_name).strip()
         recommender = CourseRecommenderV2(db)
 
-        logger.info(f"Request for university_id={university_id}, degree_name='{decoded_degree_name}'")
+        logger.info("Request for university_id=%s, degree_name='%s'", university_id, decoded_degree_name)
 
-        # 1️⃣ Gather all degree profiles
-        all_univs = recommender.get_all_universities()
-        all_profiles: List[Dict[str, Any]] = []
-        for u in all_univs:
-            profiles = recommender.build_degree_profiles(u.university_id)
-            if profiles:
-                all_profiles.extend(profiles)
+        # 1️⃣ Gather all degree profiles (with their shared TF-IDF fit)
+        all_profiles, vectorizer = recommender.get_all_profiles_with_vectorizer()
 
         if not all_profiles:
             logger.warning("No degree profiles found in any university.")
             raise HTTPException(status_code=404, detail="No degree profiles found in any university.")
 
         # 2️⃣ Find representative profiles matching the degree name
-        representative_profiles = [
-            p for p in all_profiles
-            if recommender.normalize_name(p.get("degree_title")) == recommender.normalize_name(decoded_degree_name)
-        ]
+        target_norm = recommender.normalize_name(decoded_degree_name)
+        representative_profiles = [p for p in all_profiles if p.get("norm_title") == target_norm]
 
         if not representative_profiles:
-            logger.warning(f"Degree '{decoded_degree_name}' not found in any university.")
+            logger.warning("Degree '%s' not found in any university.", decoded_degree_name)
             raise HTTPException(
                 status_code=404,
                 detail=f"Degree '{decoded_degree_name}' not found in any university."
@@ -167,11 +153,12 @@ async def recommend_courses_by_name_safe(
             "courses": list(all_courses),
         }
 
-        # 4️⃣ Find similar degrees
+        # 4️⃣ Find similar degrees (TF-IDF fit over all profiles, shared with step 5)
         similar_degrees = recommender.find_similar_degrees(
             synthetic_target_degree,
             all_profiles,
-            top_n=5
+            top_n=5,
+            vectorizer=vectorizer
         )
 
         if not similar_degrees:
@@ -188,10 +175,11 @@ async def recommend_courses_by_name_safe(
             result = recommender.suggest_courses_for_degree(
                 synthetic_target_degree,
                 similar_degrees,
-                top_n=top_n_courses
+                top_n=top_n_courses,
+                vectorizer=vectorizer
             )
         except Exception as e:
-            logger.error(f"Error in suggest_courses_for_degree: {e}")
+            logger.error("Error in suggest_courses_for_degree: %s", e)
             raise HTTPException(status_code=500, detail="Course recommendation failed due to internal error.")
 
         # 6️⃣ Format final recommendations
@@ -221,12 +209,12 @@ async def recommend_courses_by_name_safe(
     except HTTPException:
         raise
     except Exception as e:
-        logger.exception(f"Unexpected error in recommend_courses_by_name_safe: {e}")
+        logger.exception("Unexpected error in recommend_courses_by_name_safe: %s", e)
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {e}")
 
 
 @router.get("/recommend/degrees/{university_id}", summary="Recommend degrees for a university.")
-def recommend_degrees(university_id: int, top_n: int = 5, db: Session = Depends(get_db)):
+def recommend_degrees(university_id: int, top_n: int = Query(5, ge=1), db: Session = Depends(get_db)):
     """
     Recommend top N degrees for a university based on recognized skills.
     """
@@ -236,7 +224,7 @@ def recommend_degrees(university_id: int, top_n: int = 5, db: Session = Depends(
 
 
 @router.get("/recommendations/university/{univ_id}", summary="Suggest courses for a university.")
-def suggest_courses_for_university(univ_id: int, top_n: int = 10, db: Session = Depends(get_db)):
+def suggest_courses_for_university(univ_id: int, top_n: int = Query(10, ge=1), db: Session = Depends(get_db)):
     """
     Suggest top N courses for a specific university.
     """
@@ -261,5 +249,5 @@ def recommend_personalized(preferences: UserPreferences, db: Session = Depends(g
         )
         return results
     except Exception as e:
-        logger.exception(f"Error in recommend_personalized: {e}")
+        logger.exception("Error in recommend_personalized: %s", e)
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {e}")
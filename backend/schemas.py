@@ -110,7 +110,7 @@ class UserPreferences(BaseModel):
     language: Optional[str] = None
     country: Optional[str] = None
     degree_type: Optional[str] = None
-    top_n: int = 10
+    top_n: int = Field(10, ge=1)
 
 
 # =======================================================
@@ -119,7 +119,7 @@ class UserPreferences(BaseModel):
 class ElectiveRecommendationRequest(BaseModel):
     program_id: int
     target_skills: List[str]
-    top_n: int = 10
+    top_n: int = Field(10, ge=1)
 
 
 class ElectiveCourseOut(BaseModel):
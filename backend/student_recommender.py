@@ -7,24 +7,46 @@ Both engines use TF-IDF + cosine similarity over skills/courses text and lightwe
 heuristics for scoring and filtering. The original logic is preserved.
 """
 
-from typing import List, Dict, Any, Optional, Set
-from sqlalchemy.orm import Session
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from collections import defaultdict
+from typing import List, Dict, Any, Optional, Set, Tuple
+from sqlalchemy import Row, String, cast, func, lambda_stmt, select
+from sqlalchemy.orm import Session, joinedload, raiseload, selectinload
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+from sklearn.preprocessing import normalize
+from collections import Counter, defaultdict
 import logging
+import math
 import re
 
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from backend.catalog import catalog_version
+from backend.ranking import top_n_indices
 from backend.models import DegreeProgram, University, Course, Skill, CourseSkill
 
 # Configure logger for module
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
+# TF-IDF index over the skill text of every degree program, shared by all requests:
+# (catalog version, vectorizer, {program_id: row}, program matrix, skill texts).
+# Rebuilt when the catalog version changes.
+_program_index: Tuple[Optional[tuple], Optional[TfidfVectorizer], Dict[int, int], Any, List[str]] = (
+    None, None, {}, None, []
+)
+
+# Skill texts of every standalone (unlinked) course and their hashed term vectors, keyed
+# the same: (catalog version, [(course_id, lesson_name, university_name, text), ...], matrix)
+_unlinked_index: Tuple[Optional[tuple], List[Tuple[int, str, Optional[str], str]], Any] = (None, [], None)
+
 
 # -----------------------------------------------------------------------------
 # Helper: skill normalization
 # -----------------------------------------------------------------------------
+# Characters removed by _normalize_skill (compiled once at import)
+_SKILL_RE = re.compile(r"[^a-z0-9\u0370-\u03FF\u1F00-\u1FFF\s\-\+\.#]")
+
+
 def _normalize_skill(s: str) -> str:
     """
     Normalize a skill token to a compact canonical form:
@@ -36,9 +58,145 @@ def _normalize_skill(s: str) -> str:
     """
     if not s:
         return ""
-    s = str(s).strip().lower()
-    s = re.sub(r"[^a-z0-9\u0370-\u03FF\u1F00-\u1FFF\s\-\+\.#]", "", s)
-    return s
+    return _SKILL_RE.sub("", str(s).strip().lower())
+
+
+def _normalize_skills(skills) -> List[str]:
+    """
+    Normalize every skill with _normalize_skill (one call each), dropping the
+    ones that normalize to an empty string.
+    """
+    return [n for n in map(_normalize_skill, skills) if n]
+
+
+# -----------------------------------------------------------------------------
+# Helper: elective detection from Course.mand_opt_list
+# -----------------------------------------------------------------------------
+def _is_optional(mand_opt: Any) -> bool:
+    """
+    True when a course's mand_opt_list marks it as optional: a string containing
+    "optional", or a list/tuple/set with any such entry (case-insensitive).
+    """
+    if isinstance(mand_opt, str):
+        return "optional" in mand_opt.lower()
+    if isinstance(mand_opt, (list, tuple, set)):
+        return any("optional" in str(v).lower() for v in mand_opt)
+    return False
+
+
+# -----------------------------------------------------------------------------
+# Helper: case-insensitive equality of many values against one filter value
+# -----------------------------------------------------------------------------
+def _equals_ignore_case(values: List[Optional[str]], wanted: Optional[str]) -> np.ndarray:
+    """
+    Boolean array: values[i].lower() == wanted.lower(). Missing values never match
+    and an empty `wanted` matches nothing (no filter, no bonus).
+    """
+    if not wanted:
+        return np.zeros(len(values), dtype=bool)
+    lowered = np.char.lower(np.array([v or "" for v in values], dtype=str))
+    return lowered == wanted.lower()
+
+
+# -----------------------------------------------------------------------------
+# Helper: Jaccard overlap of many skill sets with one target set
+# -----------------------------------------------------------------------------
+def _overlap_ratios(skill_sets: List[Set[str]], target: Set[str]) -> np.ndarray:
+    """
+    |s & target| / |s | target| for every set in `skill_sets` (0.0 for empty unions).
+
+    The sets are encoded as rows of a binary sparse matrix over one skill
+    vocabulary, so all intersection sizes come from a single column-slice sum
+    instead of building intersection and union sets per course.
+    """
+    skill_ids: Dict[str, int] = {}
+    indptr = [0]
+    indices: List[int] = []
+    for skills in skill_sets:
+        indices.extend(skill_ids.setdefault(skill, len(skill_ids)) for skill in skills)
+        indptr.append(len(indices))
+
+    course_bin = csr_matrix(
+        (np.ones(len(indices), dtype=np.float32), indices, indptr),
+        shape=(len(skill_sets), len(skill_ids)),
+    )
+    target_cols = [skill_ids[skill] for skill in target if skill in skill_ids]
+    inter = np.asarray(course_bin[:, target_cols].sum(axis=1), dtype=np.float64).ravel()
+    union = np.diff(indptr) + len(target) - inter
+    return np.divide(inter, union, out=np.zeros(len(skill_sets)), where=union > 0)
+
+
+# -----------------------------------------------------------------------------
+# Helper: TF-IDF similarity of one query text against a list of documents
+# -----------------------------------------------------------------------------
+def _tfidf_similarities(query_text: str, docs: List[str], pretokenized: bool = False) -> np.ndarray:
+    """
+    Fit a TF-IDF vectorizer on [query_text] + docs and return the cosine similarity
+    of the query to each doc.
+
+    With pretokenized=True the texts must already be space-joined _normalize_skill
+    output; they are split on whitespace and weighted by _split_tfidf instead of
+    going through TfidfVectorizer's tokenizer and vocabulary machinery.
+
+    Rows are L2-normalized (float32, sublinear TF), so the cosine is a single
+    sparse matrix-vector product; cosine_similarity's re-normalization is skipped.
+    The whole matrix is multiplied by the query row (no `vectors[1:]` copy) and
+    the query's self-similarity is dropped from the result.
+    """
+    if pretokenized:
+        vectors = _split_tfidf([query_text] + docs)
+    else:
+        vectorizer = TfidfVectorizer(dtype=np.float32, norm="l2", sublinear_tf=True)
+        vectors = vectorizer.fit_transform([query_text] + docs)
+    return vectors.dot(vectors.getrow(0).T).toarray().ravel()[1:]
+
+
+def _split_tfidf(docs: List[str]) -> csr_matrix:
+    """
+    TF-IDF matrix of whitespace-tokenized docs, with the same weighting as
+    TfidfVectorizer(sublinear_tf=True, norm="l2", dtype=np.float32): 1 + log(tf),
+    smoothed idf = ln((1 + n) / (1 + df)) + 1, rows L2-normalized.
+
+    The docs are short skill lists, so the vocabulary and CSR arrays are built in
+    one pass over str.split output; sklearn's per-call validation and analyzer
+    overhead dominate at this size.
+    """
+    vocab: Dict[str, int] = {}
+    indptr = [0]
+    indices: List[int] = []
+    counts: List[int] = []
+    for doc in docs:
+        term_counts = Counter(vocab.setdefault(term, len(vocab)) for term in doc.split())
+        indices.extend(term_counts.keys())
+        counts.extend(term_counts.values())
+        indptr.append(len(indices))
+    if not vocab:
+        raise ValueError("empty vocabulary; the documents contain no terms")
+
+    data = np.log(np.asarray(counts, dtype=np.float32)) + np.float32(1.0)
+    df = np.bincount(np.asarray(indices, dtype=np.intp), minlength=len(vocab)).astype(np.float32)
+    idf = np.log(np.float32(len(docs) + 1) / (df + np.float32(1.0))) + np.float32(1.0)
+    data *= idf[indices]
+    matrix = csr_matrix((data, indices, indptr), shape=(len(docs), len(vocab)), dtype=np.float32)
+    return normalize(matrix, norm="l2", copy=False)
+
+
+# Stateless (no fit) vectorizer for the unlinked-course pass; L2-normalized term counts
+_HASHING_VECTORIZER = HashingVectorizer(
+    n_features=2 ** 18, alternate_sign=False, norm="l2", dtype=np.float32
+)
+
+
+def _hashed_similarities(query_text: str, doc_matrix) -> np.ndarray:
+    """
+    Cosine similarity of the query to each row of `doc_matrix` (docs already
+    transformed with _HASHING_VECTORIZER) over hashed term counts.
+
+    Nothing is fitted, and only the query is transformed per request; as the
+    rows are L2-normalized, the cosine is one sparse matvec.
+    """
+    query_vec = _HASHING_VECTORIZER.transform([query_text])
+    return doc_matrix.dot(query_vec.T).toarray().ravel()
 
 
 # =============================================================================
@@ -60,6 +218,16 @@ class CourseRecommender:
         """
         self.db = db
 
+    def warmup(self) -> None:
+        """
+        Build the program TF-IDF index and the unlinked-course index for the current
+        catalog (e.g. at startup), so the first recommend_personalized request only
+        transforms the user's text.
+        """
+        version = catalog_version()
+        self._get_program_index(version)
+        self._get_unlinked_index(version)
+
     def recommend_personalized(
         self,
         target_skills: List[str],
@@ -106,59 +274,87 @@ class CourseRecommender:
         # ---------------------------
         # Query degree programs with optional filters
         # ---------------------------
-        query = self.db.query(DegreeProgram).join(University)
+        # Lambda statements cache the compiled SQL per combination of filters; the
+        # filter values are picked up from the closures as bound parameters.
+        # Only the columns used below are selected (plain rows, no ORM objects);
+        # skill texts come from the cached program index.
+        stmt = lambda_stmt(
+            lambda: select(
+                DegreeProgram.program_id,
+                DegreeProgram.degree_titles,
+                DegreeProgram.language,
+                DegreeProgram.degree_type,
+                University.university_name,
+                University.country,
+            ).join(University)
+        )
         if language:
-            query = query.filter(DegreeProgram.language.ilike(f"%{language}%"))
+            language_pattern = f"%{language}%"
+            stmt += lambda s: s.where(DegreeProgram.language.ilike(language_pattern))
         if country:
-            query = query.filter(University.country.ilike(f"%{country}%"))
+            country_pattern = f"%{country}%"
+            stmt += lambda s: s.where(University.country.ilike(country_pattern))
         if degree_type:
-            query = query.filter(DegreeProgram.degree_type.ilike(f"%{degree_type}%"))
+            degree_type_pattern = f"%{degree_type}%"
+            stmt += lambda s: s.where(DegreeProgram.degree_type.ilike(degree_type_pattern))
 
-        programs = query.all()
+        programs = self.db.execute(stmt).all()
         if not programs:
             return {"message": "No matching programs were found."}
 
         # ---------------------------
-        # Build program skill texts for TF-IDF
+        # Look up program skill texts for TF-IDF (programs without skills are skipped)
         # ---------------------------
-        program_texts: List[str] = []
-        program_objs: List[DegreeProgram] = []
-        for prog in programs:
-            skills = self._get_program_skills(prog.program_id)
-            if not skills:
-                continue
-            program_texts.append(" ".join([s.lower() for s in skills]))
-            program_objs.append(prog)
+        version = catalog_version()
+        program_index = self._get_program_index(version)
+        _, rows, _, texts = program_index
+        program_objs: List[Row] = [prog for prog in programs if prog.program_id in rows]
+        program_texts: List[str] = [texts[rows[prog.program_id]] for prog in program_objs]
 
         if not program_texts:
             return {"message": "No skills are recorded for any matching program."}
 
         # ---------------------------
-        # Compute TF-IDF similarity between user skills and programs
+        # Look up standalone (unlinked) courses and their skill texts
+        # ---------------------------
+        unlinked, course_matrix = self._get_unlinked_index(version)
+
+        # ---------------------------
+        # Similarity between user skills and programs (TF-IDF) / unlinked courses (hashed TF)
         # ---------------------------
-        vectorizer = TfidfVectorizer()
         try:
-            vectors = vectorizer.fit_transform([user_text] + program_texts)
-            sims = cosine_similarity(vectors[0:1], vectors[1:]).flatten()
+            sims = self._program_similarities(user_text, program_index, program_objs, program_texts)
         except Exception as e:
             # If TF-IDF fails, fall back to zero similarities
             logger.exception("TF-IDF vectorization error for degree programs: %s", e)
             sims = [0.0] * len(program_objs)
 
+        course_sims = None
+        if unlinked:
+            try:
+                course_sims = _hashed_similarities(user_text, course_matrix)
+            except Exception as e:
+                logger.exception("Similarity error for unlinked courses: %s", e)
+
         # ---------------------------
         # Score and sort programs
         # ---------------------------
+        scores = np.zeros(len(program_objs))
+        n_sims = min(len(sims), len(program_objs))
+        scores[:n_sims] = np.asarray(sims, dtype=np.float64)[:n_sims]
+
+        # Small bonuses when filters align exactly (keeps behavior of original code)
+        scores += 0.05 * _equals_ignore_case([prog.language for prog in program_objs], language)
+        scores += 0.05 * _equals_ignore_case([prog.degree_type for prog in program_objs], degree_type)
+        scores += 0.05 * _equals_ignore_case(
+            [prog.country for prog in program_objs], country
+        )
+        scores = np.round(scores, 3)
+
+        # Keep the top_n (stable on ties) and only build result dicts for those
         scored_programs: List[Dict[str, Any]] = []
-        for i, prog in enumerate(program_objs):
-            score = float(sims[i]) if i < len(sims) else 0.0
-
-            # Small bonuses when filters align exactly (keeps behavior of original code)
-            if language and prog.language and prog.language.lower() == language.lower():
-                score += 0.05
-            if degree_type and prog.degree_type and prog.degree_type.lower() == degree_type.lower():
-                score += 0.05
-            if country and prog.university.country and prog.university.country.lower() == country.lower():
-                score += 0.05
+        for i in top_n_indices(scores, top_n):
+            prog = program_objs[i]
 
             # Determine a human-friendly degree name. Original code attempted EL/EN selection.
             degree_name = "N/A"
@@ -172,43 +368,32 @@ class CourseRecommender:
             scored_programs.append({
                 "program_id": prog.program_id,
                 "degree_name": degree_name,
-                "university": getattr(prog.university, "university_name", None),
+                "university": prog.university_name,
                 "language": prog.language,
-                "country": getattr(prog.university, "country", None),
+                "country": prog.country,
                 "degree_type": prog.degree_type,
-                "score": round(score, 3)
+                "score": float(scores[i])
             })
 
-        scored_programs = sorted(scored_programs, key=lambda x: x["score"], reverse=True)[:top_n]
-
         # ---------------------------
         # Recommend standalone (unlinked) courses
         # ---------------------------
-        unlinked_courses = self.db.query(Course).filter(Course.program_id == None).all()
-        course_texts: List[str] = []
-        course_objs: List[Course] = []
-        for c in unlinked_courses:
-            skills = self._get_course_skills(c.course_id)
-            if skills:
-                course_texts.append(" ".join([s.lower() for s in skills]))
-                course_objs.append(c)
-
         unlinked_recs: List[Dict[str, Any]] = []
-        if course_texts:
-            try:
-                vectors = vectorizer.fit_transform([user_text] + course_texts)
-                sims = cosine_similarity(vectors[0:1], vectors[1:]).flatten()
-                for i, c in enumerate(course_objs):
-                    unlinked_recs.append({
-                        "course_id": c.course_id,
-                        "lesson_name": c.lesson_name,
-                        "university": getattr(c.university, "university_name", None),
-                        "score": round(float(sims[i]) if i < len(sims) else 0.0, 3)
-                    })
-                unlinked_recs = sorted(unlinked_recs, key=lambda x: x["score"], reverse=True)[:top_n]
-            except Exception as e:
-                logger.exception("TF-IDF error for unlinked courses: %s", e)
-                unlinked_recs = []
+        if course_sims is not None:
+            course_scores = np.zeros(len(unlinked))
+            n_course_sims = min(len(course_sims), len(unlinked))
+            course_scores[:n_course_sims] = np.asarray(course_sims, dtype=np.float64)[:n_course_sims]
+            course_scores = np.round(course_scores, 3)
+
+            # Same partial top_n selection as for programs; dicts only for the winners
+            for i in top_n_indices(course_scores, top_n):
+                course_id, lesson_name, university_name, _ = unlinked[i]
+                unlinked_recs.append({
+                    "course_id": course_id,
+                    "lesson_name": lesson_name,
+                    "university": university_name,
+                    "score": float(course_scores[i])
+                })
 
         # ---------------------------
         # Group user skills by category for presentation
@@ -222,46 +407,149 @@ class CourseRecommender:
         }
 
     # -------------------------------------------------------------------------
-    # Helper: extract all skill names from a program's courses
+    # Helper: TF-IDF similarity against the cached program index
     # -------------------------------------------------------------------------
-    def _get_program_skills(self, program_id: int) -> List[str]:
+    def _get_program_index(
+        self, version: tuple
+    ) -> Tuple[Optional[TfidfVectorizer], Dict[int, int], Any, List[str]]:
         """
-        Return a list of unique skill names referenced by the courses of the given program.
-        Returns an empty list when the program isn't found or there are no skills.
+        Return (vectorizer, {program_id: row}, matrix, texts) for the skill texts
+        of every degree program; programs without skills have no row.
+
+        The skill texts and the vectorizer fitted over them are built once (not per
+        request on the filtered subset plus the user's text) and kept process-wide
+        until the catalog version changes, so requests skip the program ->
+        courses -> skills walk entirely. The vectorizer is None when the texts
+        have no usable vocabulary.
         """
-        program = self.db.query(DegreeProgram).filter_by(program_id=program_id).first()
-        if not program:
-            return []
-
-        skills_set: Set[str] = set()
-        for course in getattr(program, "courses", []) or []:
-            for cs in getattr(course, "skills", []) or []:
+        global _program_index
+        if _program_index[0] != version:
+            programs = self.db.query(DegreeProgram).options(
+                selectinload(DegreeProgram.courses).selectinload(Course.skills).joinedload(CourseSkill.skill)
+            ).all()
+            rows: Dict[int, int] = {}
+            texts: List[str] = []
+            for prog in programs:
+                skills = self._get_program_skills(prog)
+                if skills:
+                    rows[prog.program_id] = len(texts)
+                    texts.append(" ".join([s.lower() for s in skills]))
+
+            vectorizer, matrix = None, None
+            if texts:
+                vectorizer = TfidfVectorizer(dtype=np.float32, norm="l2", sublinear_tf=True)
                 try:
-                    skill_name = getattr(cs.skill, "skill_name", None)
-                    if skill_name:
-                        skills_set.add(skill_name)
-                except Exception:
-                    # Defensive: skip malformed relationships
-                    continue
-        return list(skills_set)
+                    matrix = vectorizer.fit_transform(texts)
+                except ValueError:
+                    # e.g. empty vocabulary after tokenization
+                    vectorizer = None
+            _program_index = (version, vectorizer, rows, matrix, texts)
+        return _program_index[1:]
+
+    def _get_unlinked_index(
+        self, version: tuple
+    ) -> Tuple[List[Tuple[int, str, Optional[str], str]], Any]:
+        """
+        Return the (course_id, lesson_name, university_name, skill_text) entries of
+        every standalone course (program_id IS NULL) that has skills, together with
+        their hashed term matrix (None when there are no such courses).
+
+        Built with one aggregated query (the DB concatenates each course's skill
+        names) and kept process-wide until the catalog version changes, so
+        requests only transform the user's text instead of loading the courses,
+        joining their skills and vectorizing them each time.
+        """
+        global _unlinked_index
+        if _unlinked_index[0] != version:
+            # On MySQL, group_concat_max_len is raised per connection in database.py
+            rows = (
+                self.db.query(
+                    Course.course_id,
+                    Course.lesson_name,
+                    University.university_name,
+                    func.aggregate_strings(Skill.skill_name, " ").label("skill_text"),
+                )
+                .select_from(Course)
+                .join(CourseSkill, CourseSkill.course_id == Course.course_id)
+                .join(Skill, Skill.skill_id == CourseSkill.skill_id)
+                .outerjoin(University, University.university_id == Course.university_id)
+                .filter(Course.program_id == None, Skill.skill_name != "")
+                .group_by(Course.course_id, Course.lesson_name, University.university_name)
+                .order_by(Course.course_id)
+                .all()
+            )
+            entries = [
+                (row.course_id, row.lesson_name, row.university_name, row.skill_text.lower())
+                for row in rows
+            ]
+            matrix = (
+                _HASHING_VECTORIZER.transform([entry[3] for entry in entries]) if entries else None
+            )
+            _unlinked_index = (version, entries, matrix)
+        return _unlinked_index[1:]
+
+    @staticmethod
+    def _program_similarities(
+        user_text: str,
+        program_index: Tuple[Optional[TfidfVectorizer], Dict[int, int], Any, List[str]],
+        program_objs: List[Row],
+        program_texts: List[str],
+    ) -> np.ndarray:
+        """
+        Cosine similarity of the user's skill text to each program, using the cached
+        program index (rows are L2-normalized, so the cosine is a dot product).
+        Without a fitted index vectorizer a per-request TF-IDF fit is used.
+
+        User terms missing from the program vocabulary match no program but still
+        count in the user vector's norm, weighted like the rarest vocabulary term
+        (max idf_), so a query that only partly matches cannot score a cosine of 1.
+        """
+        vectorizer, rows, matrix, _ = program_index
+        if vectorizer is None:
+            return _tfidf_similarities(user_text, program_texts)
+
+        vocabulary = vectorizer.vocabulary_
+        idf = vectorizer.idf_
+        max_idf = float(idf.max())
+        cols: List[int] = []
+        weights: List[float] = []
+        sq_norm = 0.0
+        # Same weighting as the fitted vectorizer: sublinear tf times idf
+        for term, count in Counter(vectorizer.build_analyzer()(user_text)).items():
+            col = vocabulary.get(term)
+            weight = (1.0 + math.log(count)) * (max_idf if col is None else float(idf[col]))
+            sq_norm += weight * weight
+            if col is not None:
+                cols.append(col)
+                weights.append(weight)
+        if not cols:
+            return np.zeros(len(program_objs))
+
+        user_vec = csr_matrix(
+            (np.asarray(weights, dtype=np.float32) / np.float32(math.sqrt(sq_norm)),
+             (np.zeros(len(cols), dtype=np.intp), cols)),
+            shape=(1, len(vocabulary)),
+        )
+        program_matrix = matrix[[rows[prog.program_id] for prog in program_objs]]
+        return program_matrix.dot(user_vec.T).toarray().ravel()
 
     # -------------------------------------------------------------------------
-    # Helper: extract skill names attached to a course (CourseSkill relation)
+    # Helper: extract all skill names from a program's courses
     # -------------------------------------------------------------------------
-    def _get_course_skills(self, course_id: int) -> List[str]:
+    def _get_program_skills(self, program: DegreeProgram) -> List[str]:
         """
-        Return a list of skill names for a given course_id by inspecting CourseSkill rows.
+        Return a list of unique skill names referenced by the courses of the given program.
+        Returns an empty list when there are no skills.
+
+        The program is expected to come with courses and skills eager-loaded
+        (see _get_program_index), so no queries are issued here.
         """
-        skills: List[str] = []
-        try:
-            entries = self.db.query(CourseSkill).filter_by(course_id=course_id).all()
-            for cs in entries:
-                if hasattr(cs, "skill") and getattr(cs.skill, "skill_name", None):
-                    skills.append(cs.skill.skill_name)
-        except Exception:
-            # Defensive: return empty on DB errors
-            pass
-        return skills
+        skills_set: Set[str] = set()
+        for course in program.courses:
+            for cs in course.skills:
+                if cs.skill is not None and cs.skill.skill_name:
+                    skills_set.add(cs.skill.skill_name)
+        return list(skills_set)
 
     # -------------------------------------------------------------------------
     # Helper: group skills by category (presentation)
@@ -269,27 +557,45 @@ class CourseRecommender:
     def _group_skills_by_category(self, skills: List[str]) -> Dict[str, List[str]]:
         """
         Group skill names by their stored category. If a skill's category is not present,
-        group under 'Other'. Matching is attempted using case-insensitive contains.
+        group under 'Other'. Matching is case-insensitive on the full skill name.
+
+        Categories are stored per course on CourseSkill.categories; the first category
+        of the skill's first course link is used. All skills are resolved with a
+        single IN query instead of one lookup per skill.
         """
         grouped: Dict[str, List[str]] = {}
+        category_by_skill: Dict[str, str] = {}
+        try:
+            rows = (
+                self.db.query(func.lower(Skill.skill_name), CourseSkill.categories)
+                .outerjoin(CourseSkill, CourseSkill.skill_id == Skill.skill_id)
+                .filter(func.lower(Skill.skill_name).in_({s.lower() for s in skills}))
+                .order_by(Skill.skill_id, CourseSkill.course_id)
+                .all()
+            )
+        except Exception:
+            logger.exception("Skill category lookup failed")
+            rows = []
+
+        for name, categories in rows:
+            if name in category_by_skill:
+                continue
+            # categories may be a list of labels or a dict; attempt sensible extraction
+            category = "Other"
+            if isinstance(categories, dict):
+                category = categories.get("preferredLabel", "Other")
+            elif isinstance(categories, (list, tuple)):
+                category = str(categories[0]) if categories else "Other"
+            elif categories:
+                category = str(categories)
+            category_by_skill[name] = category
+
         for s in skills:
-            try:
-                # Find a skill row matching the token (case-insensitive contains)
-                skill_obj = self.db.query(Skill).filter(Skill.skill_name.ilike(f"%{s}%")).first()
-                category = "Other"
-                if skill_obj:
-                    # Skill.categories may be a dict or another structure; attempt sensible extraction
-                    if isinstance(skill_obj.categories, dict):
-                        category = skill_obj.categories.get("preferredLabel", "Other")
-                    elif skill_obj.categories:
-                        category = str(skill_obj.categories)
-                grouped.setdefault(category, []).append(s)
-            except Exception:
-                grouped.setdefault("Other", []).append(s)
-
-        # Deduplicate and sort each category list
-        for k in list(grouped.keys()):
-            grouped[k] = sorted(set(grouped[k]), key=lambda x: x.lower())
+            grouped.setdefault(category_by_skill.get(s.lower(), "Other"), []).append(s)
+
+        # Sort each category list (case-insensitive) and deduplicate in that order
+        for k, v in grouped.items():
+            grouped[k] = list(dict.fromkeys(sorted(v, key=str.lower)))
 
         # Return categories ordered alphabetically
         return dict(sorted(grouped.items(), key=lambda x: x[0].lower()))
@@ -362,7 +668,7 @@ class CourseRecommenderV4:
         # ---------------------------
         # Normalize user skills
         # ---------------------------
-        user_skills_norm = [_normalize_skill(s) for s in (target_skills or []) if _normalize_skill(s)]
+        user_skills_norm = _normalize_skills(target_skills or [])
         user_skills_set: Set[str] = set(user_skills_norm)
         if not user_skills_set:
             return {"message": "Please provide at least one valid skill."}
@@ -371,23 +677,33 @@ class CourseRecommenderV4:
         # ---------------------------
         # Locate the degree program
         # ---------------------------
-        program = self.db.query(DegreeProgram).filter_by(program_id=program_id, university_id=univ_id).first()
+        program = (
+            self.db.query(DegreeProgram.program_id)
+            .filter_by(program_id=program_id, university_id=univ_id)
+            .first()
+        )
         if not program:
             return {"message": "Degree program not found for this university."}
 
         # ---------------------------
         # Identify elective courses from the program
         # ---------------------------
-        elective_courses: List[Course] = []
-        for c in getattr(program, "courses", []) or []:
-            mand_opt = getattr(c, "mand_opt_list", None)
-            is_optional = False
-            if isinstance(mand_opt, str) and "optional" in mand_opt.lower():
-                is_optional = True
-            elif isinstance(mand_opt, (list, tuple, set)):
-                is_optional = any("optional" in str(v).lower() for v in mand_opt)
-            if is_optional:
-                elective_courses.append(c)
+        # The DB pre-filters on the serialized mand_opt_list so only candidate electives
+        # (with skills and university eager-loaded, other relationships raising on
+        # access) are transferred; the exact check below still runs on each of them.
+        candidates = (
+            self.db.query(Course)
+            .filter(Course.program_id == program_id)
+            .filter(cast(Course.mand_opt_list, String).ilike("%optional%"))
+            .options(
+                selectinload(Course.skills).joinedload(CourseSkill.skill),
+                joinedload(Course.university),
+                raiseload("*"),
+            )
+            .order_by(Course.course_id)
+            .all()
+        )
+        elective_courses: List[Course] = [c for c in candidates if _is_optional(c.mand_opt_list)]
 
         if not elective_courses:
             return {"message": "No elective courses were found for this program."}
@@ -403,23 +719,15 @@ class CourseRecommenderV4:
         for c in elective_courses:
             raw_skill_names: List[str] = []
 
-            # support two possible relationship shapes: courseskills or skills
-            if hasattr(c, "courseskills"):
-                for cs in getattr(c, "courseskills") or []:
-                    if hasattr(cs, "skill") and getattr(cs.skill, "skill_name", None):
-                        raw_skill_names.append(str(cs.skill.skill_name))
-            elif hasattr(c, "skills"):
-                for cs in getattr(c, "skills") or []:
-                    if hasattr(cs, "skill") and getattr(cs.skill, "skill_name", None):
-                        raw_skill_names.append(str(cs.skill.skill_name))
-                    elif getattr(cs, "skill_name", None):
-                        # Some models store skill_name directly on the relation
-                        raw_skill_names.append(str(cs.skill_name))
+            # Course.skills holds the CourseSkill rows (skill eager-loaded)
+            for cs in c.skills:
+                if cs.skill is not None and cs.skill.skill_name:
+                    raw_skill_names.append(str(cs.skill.skill_name))
 
             if not raw_skill_names:
                 continue
 
-            normalized = [_normalize_skill(s) for s in raw_skill_names if _normalize_skill(s)]
+            normalized = _normalize_skills(raw_skill_names)
             if not normalized:
                 continue
 
@@ -435,33 +743,42 @@ class CourseRecommenderV4:
         # TF-IDF similarity between user skills and course skill text
         # ---------------------------
         try:
-            vectorizer = TfidfVectorizer()
-            docs = [user_text] + course_skill_texts
-            vectors = vectorizer.fit_transform(docs)
-            tfidf_scores = cosine_similarity(vectors[0:1], vectors[1:]).flatten().tolist()
+            tfidf_scores = _tfidf_similarities(user_text, course_skill_texts, pretokenized=True).tolist()
         except Exception as e:
             logger.exception("TF-IDF vectorization failed for electives: %s", e)
             tfidf_scores = [0.0] * len(course_objs)
 
         # ---------------------------
-        # Compute final scores and reasons
+        # Compute final scores
         # ---------------------------
-        scored: List[Dict[str, Any]] = []
-        for i, c in enumerate(course_objs):
-            course_set = course_skill_sets[i]
-            matched = sorted(list(user_skills_set & course_set))
-            missing = sorted(list(course_set - user_skills_set))
-            union_set = course_set | user_skills_set
-            overlap_ratio = (len(matched) / len(union_set)) if union_set else 0.0
-            tfidf_score = float(tfidf_scores[i]) if i < len(tfidf_scores) else 0.0
-
-            # filter out ultra-low relevance candidates
-            if overlap_ratio < min_overlap_ratio and tfidf_score < 0.01:
-                continue
+        overlap_ratios = _overlap_ratios(course_skill_sets, user_skills_set)
+        n = len(course_objs)
+        tfidf_arr = np.zeros(n)
+        n_tfidf = min(len(tfidf_scores), n)
+        tfidf_arr[:n_tfidf] = np.asarray(tfidf_scores[:n_tfidf], dtype=np.float64)
+
+        # combine signals for every course at once
+        final_scores = np.round(
+            np.clip(self.tfidf_weight * tfidf_arr + self.overlap_weight * overlap_ratios, 0.0, 1.0), 3
+        )
+
+        # filter out ultra-low relevance candidates and scores below 0.1
+        keep = ~((overlap_ratios < min_overlap_ratio) & (tfidf_arr < 0.01)) & (final_scores >= 0.1)
+        candidates = np.flatnonzero(keep)
+
+        # ---------------------------
+        # Select the top_n, then build result dicts and reasons only for those
+        # ---------------------------
+        # Partial selection of the best max(1, top_n); ties keep their original order
+        top_idx = candidates[top_n_indices(final_scores[candidates], max(1, top_n))]
 
-            # combine signals
-            final_score = (self.tfidf_weight * tfidf_score) + (self.overlap_weight * overlap_ratio)
-            final_score = max(0.0, min(1.0, final_score))
+        scored_sorted: List[Dict[str, Any]] = []
+        for i in top_idx:
+            c = course_objs[i]
+            course_set = course_skill_sets[i]
+            matched = sorted(user_skills_set & course_set)
+            missing = sorted(course_set - user_skills_set)
+            tfidf_score = float(tfidf_arr[i])
 
             # human-friendly reason text describing why the course scored
             reason_parts: List[str] = []
@@ -471,25 +788,19 @@ class CourseRecommenderV4:
                 reason_parts.append(f"Semantic similarity: {round(tfidf_score, 3)}")
             reason_text = "; ".join(reason_parts) if reason_parts else "Low relevance."
 
-            scored.append({
-                "course_id": getattr(c, "course_id", None),
-                "lesson_name": getattr(c, "lesson_name", None),
-                "university": getattr(getattr(c, "university", None), "university_name", None),
-                "final_score": round(final_score, 3),
+            scored_sorted.append({
+                "course_id": c.course_id,
+                "lesson_name": c.lesson_name,
+                "university": c.university.university_name if c.university else None,
+                "final_score": float(final_scores[i]),
                 "tfidf_score": round(tfidf_score, 3),
-                "overlap_ratio": round(overlap_ratio, 3),
+                "overlap_ratio": round(float(overlap_ratios[i]), 3),
                 "matching_skills": matched,
                 "missing_skills": missing,
                 "reason": reason_text,
                 "skills": course_raw_skills[i],
             })
 
-        # ---------------------------
-        # Filter, sort and limit to top_n
-        # ---------------------------
-        scored_filtered = [c for c in scored if c["final_score"] >= 0.1]
-        scored_sorted = sorted(scored_filtered, key=lambda x: x["final_score"], reverse=True)[:max(1, top_n)]
-
         return {
             "recommended_electives": scored_sorted,
             "meta": {